@@ -0,0 +1,167 @@
+"""
+Benchmark bytes stored and encode/decode CPU time of the cache codecs, Per key family.
+
+Payloads are sampled from a running redis (--redis-url) when given, Otherwise synthetic
+payloads shaped like the MovieDB responses are used.
+
+Usage:
+    python benchmarks/cache_codec.py --redis-url redis://localhost:6379 --samples 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis.asyncio as redis  # noqa: E402
+
+import env  # noqa: E402
+from codec import Codec  # noqa: E402
+
+FAMILIES = ["detail", "featured_movies", "movies_by_genre", "search", "genres",
+            "watchlist_movie_detail", "user", "favorite"]
+
+# Families which are cached with get_or_set, So they're always stored as JSON (regardless of the format)
+JSON_FAMILIES = {"detail", "featured_movies", "movies_by_genre", "search", "genres", "user"}
+
+CODECS = {
+    "json": Codec("json"),
+    "json+zlib": Codec("json", "zlib", compression_threshold=0, compression_level=6),
+    "json+zstd": Codec("json", "zstd", compression_threshold=0),
+    "msgpack": Codec("msgpack"),
+    "msgpack+zstd": Codec("msgpack", "zstd", compression_threshold=0)
+}
+
+
+def fake_movie(movie_id: int) -> dict:
+    return {
+        "adult": False,
+        "backdrop_path": f"/{movie_id:08x}backdrop.jpg",
+        "genre_ids": random.sample(range(10, 10800), 3),
+        "id": movie_id,
+        "original_language": "en",
+        "original_title": f"Movie {movie_id}",
+        "overview": " ".join(random.choice(["a", "story", "about", "the", "hero", "who", "saves", "world"])
+                            for _ in range(60)),
+        "popularity": random.random() * 1000,
+        "poster_path": f"/{movie_id:08x}poster.jpg",
+        "release_date": "2024-05-01",
+        "title": f"Movie {movie_id}",
+        "video": False,
+        "vote_average": round(random.random() * 10, 3),
+        "vote_count": random.randint(0, 20000)
+    }
+
+
+def fake_page() -> dict:
+    return {"page": 1, "results": [fake_movie(random.randint(1, 10 ** 6)) for _ in range(20)],
+            "total_pages": 500, "total_results": 10000}
+
+
+def fake_payload(family: str) -> Any:
+    if family == "detail":
+        movie = fake_movie(random.randint(1, 10 ** 6))
+        movie["recommendations"] = fake_page()
+        movie["videos"] = {"results": [{"key": f"{i:011x}", "name": f"Trailer {i}", "site": "YouTube",
+                                        "type": "Trailer", "official": True} for i in range(30)]}
+        movie["images"] = {key: [{"file_path": f"/{i:016x}.jpg", "aspect_ratio": 1.778, "height": 1080,
+                                  "width": 1920, "vote_average": 5.3, "vote_count": 4} for i in range(60)]
+                           for key in ["backdrops", "logos", "posters"]}
+        return movie
+
+    if family == "featured_movies":
+        return {"now_playing": fake_page()["results"][:5], "popular": fake_page()["results"],
+                "top_rated": fake_page()["results"], "upcoming": fake_page()["results"]}
+
+    if family in ["movies_by_genre", "search"]:
+        return fake_page()
+
+    if family == "genres":
+        return [{"id": i, "name": f"Genre {i}"} for i in range(19)]
+
+    if family == "favorite":
+        return True
+
+    if family == "watchlist_movie_detail":
+        movie = fake_movie(random.randint(1, 10 ** 6))
+        return {"title": movie["title"], "poster_path": movie["poster_path"], "genre_ids": movie["genre_ids"]}
+
+    return {"id": "6f1c2a34-5b6d-4e7f-8a9b-0c1d2e3f4a5b", "email": "user@example.com", "name": "User",
+            "age": 30, "genres": ["Action", "Drama"], "created_at": "2024-05-01T10:00:00",
+            "modified_at": "2024-05-01T10:00:00"}
+
+
+async def sample_from_redis(url: str, samples: int) -> dict[str, list[Any]]:
+    client = redis.from_url(url)
+    reader = Codec()
+    payloads: dict[str, list[Any]] = {}
+
+    for family in FAMILIES:
+        keys = [
+            key async for key in client.scan_iter(match=f"{env.CACHE_NAMESPACE}:{family}:*", count=1000)
+            if not key.endswith((b"-fresh", b"-lock", b"-etag", b"-variants"))
+        ][:samples]
+        values = await client.mget(keys) if keys else []
+        payloads[family] = [reader.decode(value) for value in values if value]
+
+    await client.aclose()
+    return payloads
+
+
+def measure(codec: Codec, payloads: list[Any], rounds: int) -> tuple[float, float, float]:
+    encoded = [codec.encode(payload) for payload in payloads]
+    stored_bytes = sum(map(len, encoded)) / len(encoded)
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        for payload in payloads:
+            codec.encode(payload)
+    encode_time = (time.perf_counter() - start_time) / (rounds * len(payloads))
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        for data in encoded:
+            codec.decode(data)
+    decode_time = (time.perf_counter() - start_time) / (rounds * len(payloads))
+
+    return stored_bytes, encode_time * 1_000_000, decode_time * 1_000_000
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.redis_url:
+        payloads = asyncio.run(sample_from_redis(args.redis_url, args.samples))
+    else:
+        random.seed(0)
+        payloads = {family: [fake_payload(family) for _ in range(args.samples)] for family in FAMILIES}
+
+    print(f"{'family':<24}{'codec':<16}{'bytes':>10}{'ratio':>8}{'encode us':>12}{'decode us':>12}")
+
+    for family, family_payloads in payloads.items():
+        if not family_payloads:
+            continue
+
+        baseline = None
+
+        for name, codec in CODECS.items():
+            if family in JSON_FAMILIES and codec.format != "json":
+                continue
+
+            stored_bytes, encode_time, decode_time = measure(codec, family_payloads, args.rounds)
+            baseline = baseline or stored_bytes
+
+            print(f"{family:<24}{name:<16}{stored_bytes:>10.0f}{stored_bytes / baseline:>8.2f}"
+                  f"{encode_time:>12.1f}{decode_time:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis-url", help="Sample the payloads from this redis instead of synthetic ones")
+    parser.add_argument("--samples", type=int, default=20, help="Payloads per key family")
+    parser.add_argument("--rounds", type=int, default=20, help="Encode/decode rounds per payload")
+
+    main(parser.parse_args())
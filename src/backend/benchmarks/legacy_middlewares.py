@@ -0,0 +1,154 @@
+"""
+Logging and prometheus middlewares as they were before the pure ASGI rewrite,
+i.e: Registered with app.middleware("http") and run through BaseHTTPMiddleware's call_next.
+Kept only as the baseline of benchmarks/middleware_overhead.py.
+
+They log through the current logger and record metrics in their own registry,
+So they can run side by side with the current middlewares.
+"""
+
+import random
+import time
+import logging
+import uuid
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+import env
+from middlewares.logger import PASSWORD_PATTERN, logger, request_id_var
+
+
+class LoggingMiddleware:
+    """
+    Logging Middleware to log all details related to a request & response or
+    any error that gets raised, As a single line per request.
+    """
+
+    def __init__(self):
+        self.headers = {header.strip().lower() for header in env.LOG_HEADERS.split(",") if header.strip()}
+
+    async def __call__(self, request: Request, call_next: Callable) -> Response:
+        # Start timing the request
+        start_time = time.perf_counter()
+
+        # Use request ID of the caller (i.e: a proxy) if any, Otherwise generate a new one
+        request_id = request.headers.get("x-request-id", "")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        # Capture request body only when it's enabled, Since it needs to be read in memory
+        body = None
+        if env.LOG_BODY_MAX_BYTES and request.method in ["POST", "PUT", "PATCH"]:
+            body = await self._get_body(request)
+
+        # Process the request through the application
+        try:
+            response = await call_next(request)
+
+        except Exception as e:
+            # Log any errors
+            self._log(request, request_id, start_time, body, error=e)
+            raise e
+
+        finally:
+            request_id_var.reset(token)
+
+        response.headers["X-Request-ID"] = request_id
+
+        # Log all errors, But only a sample of successful requests
+        if response.status_code >= 400 or random.random() < env.LOG_SUCCESS_SAMPLE_RATE:
+            self._log(request, request_id, start_time, body, response=response)
+
+        return response
+
+    @staticmethod
+    async def _get_body(request: Request) -> str:
+        try:
+            body = await request.body()
+            body = body[:env.LOG_BODY_MAX_BYTES].decode(errors="replace")
+            return PASSWORD_PATTERN.sub(r'\1"***"', body)
+        except Exception as _:
+            return "Could not decode body"
+
+    def _log(self, request: Request, request_id: str, start_time: float, body: str | None,
+             response: Response | None = None, error: Exception | None = None) -> None:
+        # Get client IP, handling proxy forwarding
+        client_ip = request.client.host if request.client else None
+        forwarded_for = request.headers.get("X-Forwarded-For")
+        if forwarded_for:
+            client_ip = forwarded_for.split(",")[0]
+
+        data: dict[str, Any] = {
+            "message": f"{request.method} {request.url.path}",
+            "client_ip": client_ip,
+            "method": request.method,
+            "path": request.url.path,
+            "query": request.url.query,
+            "headers": {key: value for key, value in request.headers.items() if key in self.headers},
+            "process_time_ms": round((time.perf_counter() - start_time) * 1000, 2)
+        }
+
+        if body is not None:
+            data["body"] = body
+
+        if response is not None:
+            data["status_code"] = response.status_code
+            data["response_headers"] = {key: value for key, value in response.headers.items()
+                                        if key in self.headers}
+
+        if error is not None:
+            data["status_code"] = 500
+            data["error"] = str(error)
+
+        # Request ID is set explicitly, Since the request context is already reset
+        logger.log(logging.ERROR if error is not None or data["status_code"] >= 500 else logging.INFO,
+                   data, extra={"request_id": request_id}, exc_info=error)
+
+
+class PrometheusMiddleware:
+    """
+    Prometheus Middleware for recording request related stats like:
+    Total request count and request duration on prometheus.
+    """
+
+    def __init__(self):
+        registry = CollectorRegistry()
+
+        # Initialize the http_request_total and http_request_duration
+        self.http_request_total = Counter(
+            name="http_requests_total",
+            documentation="Total number of HTTP requests.",
+            labelnames=["method", "path"],
+            registry=registry
+        )
+
+        self.http_request_duration = Histogram(
+            name="http_request_duration_seconds",
+            documentation="HTTP request duration in seconds.",
+            labelnames=["method", "path", "status"],
+            registry=registry
+        )
+
+    async def __call__(self, request: Request, call_next: Callable) -> Response:
+        # Record total requests received
+        self.http_request_total.labels(method=request.method,
+                                       path=request.url.path).inc()
+
+        # Start timing the request
+        start_time = time.perf_counter()
+
+        # Continue processing the request
+        response: Response = await call_next(request)
+
+        # Find how much time it took to process the request, In seconds.
+        duration = time.perf_counter() - start_time
+
+        # Record the request duration.
+        self.http_request_duration.labels(
+            method=request.method,
+            path=request.url.path,
+            status=response.status_code
+        ).observe(duration)
+
+        return response
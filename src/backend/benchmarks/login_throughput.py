@@ -0,0 +1,85 @@
+"""
+Benchmark login throughput alongside concurrent content reads against a running server,
+To check that password hashing doesn't stall the rest of the requests.
+
+Usage:
+    python benchmarks/login_throughput.py --url http://localhost:8000 \\
+        --email user@example.com --password 'Secret@123' --logins 8 --readers 32 --duration 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.statuses: Counter = Counter()
+
+    def record(self, latency: float, status_code: int) -> None:
+        self.latencies.append(latency)
+        self.statuses[status_code] += 1
+
+    def report(self, name: str, duration: float) -> str:
+        if not self.latencies:
+            return f"{name}: no requests completed"
+
+        latencies = sorted(self.latencies)
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+
+        return (
+            f"{name}: {len(latencies) / duration:.1f} req/s, "
+            f"p50={percentiles[49] * 1000:.1f}ms p95={percentiles[94] * 1000:.1f}ms "
+            f"p99={percentiles[98] * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms, "
+            f"statuses={dict(self.statuses)}"
+        )
+
+
+async def run_loop(client: httpx.AsyncClient, stats: Stats, deadline: float,
+                   method: str, path: str, **kwargs) -> None:
+    while time.perf_counter() < deadline:
+        start_time = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            status_code = 0
+        stats.record(time.perf_counter() - start_time, status_code)
+
+
+async def main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.logins + args.readers)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        login_stats, read_stats = Stats(), Stats()
+        deadline = time.perf_counter() + args.duration
+
+        credentials = {"email": args.email, "password": args.password}
+
+        await asyncio.gather(
+            *[run_loop(client, login_stats, deadline, "POST", "/api/auth/login/", json=credentials)
+              for _ in range(args.logins)],
+            *[run_loop(client, read_stats, deadline, "GET", args.read_path)
+              for _ in range(args.readers)]
+        )
+
+    print(login_stats.report("login", args.duration))
+    print(read_stats.report("content reads", args.duration))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--read-path", default="/api/content/genres/")
+    parser.add_argument("--logins", type=int, default=8, help="Concurrent login loops")
+    parser.add_argument("--readers", type=int, default=32, help="Concurrent content read loops")
+    parser.add_argument("--duration", type=float, default=20, help="Duration in seconds")
+
+    asyncio.run(main(parser.parse_args()))
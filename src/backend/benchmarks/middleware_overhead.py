@@ -0,0 +1,137 @@
+"""
+Microbenchmark the per-request overhead of the logging and prometheus middlewares,
+Comparing the old call_next (BaseHTTPMiddleware) ones with the current pure ASGI ones.
+
+The app (as built by main.get_app, with the compression middleware) is called directly over ASGI
+(no server or network) on the health-check route and the cached featured movies route.
+The featured movies are cached up front with a synthetic payload, So the route is served
+from the cache (memory, then redis) like in production. It needs redis as configured in env.
+
+Usage:
+    python benchmarks/middleware_overhead.py --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI  # noqa: E402
+
+import cache_keys  # noqa: E402
+import legacy_middlewares  # noqa: E402
+from cache import CustomAsyncRedisClient, create_cache_client  # noqa: E402
+from content.api_client import create_client  # noqa: E402
+from main import get_app, health_check  # noqa: E402
+from middlewares.compression import CompressionMiddleware  # noqa: E402
+from middlewares.logger import LoggingMiddleware, log_listener  # noqa: E402
+from middlewares.prometheus import PrometheusMiddleware  # noqa: E402
+
+PATHS = ["/health-check/", "/api/content/featured-movies/"]
+
+
+def fake_movies(count: int) -> list[dict]:
+    return [{"id": i, "title": f"Movie {i}", "overview": "x" * 300, "genre_ids": [1, 2, 3],
+             "popularity": 100.0 - i, "poster_path": f"/{i:08x}poster.jpg"} for i in range(count)]
+
+
+async def cache_featured_movies(cache: CustomAsyncRedisClient) -> None:
+    """
+    Cache a payload shaped like the featured movies, Fresh for the whole run
+    """
+
+    async def fetch() -> dict:
+        return {"now_playing": fake_movies(5), "popular": fake_movies(20),
+                "top_rated": fake_movies(20), "upcoming": fake_movies(20)}
+
+    key = cache_keys.FEATURED_MOVIES.key()
+    await cache.delete(key)
+    await cache.get_or_set_entry(key, fetch, expiry=cache_keys.FEATURED_MOVIES.expiry, soft_expiry=86400,
+                                 local_expiry=cache_keys.FEATURED_MOVIES.local_expiry)
+
+
+def create_app(variant: str, cache: CustomAsyncRedisClient, api_client) -> FastAPI:
+    app = get_app()
+    app.get("/health-check/")(health_check)
+
+    app.state.cache = cache
+    app.state.api_client = api_client
+
+    app.add_middleware(CompressionMiddleware)
+
+    if variant == "call_next":
+        app.middleware("http")(legacy_middlewares.LoggingMiddleware())
+        app.middleware("http")(legacy_middlewares.PrometheusMiddleware())
+
+    elif variant == "asgi":
+        app.add_middleware(LoggingMiddleware)
+        app.add_middleware(PrometheusMiddleware)
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> None:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"localhost"), (b"user-agent", b"benchmark"),
+                                     (b"accept-encoding", b"gzip, br")],
+        "client": ("127.0.0.1", 12345), "server": ("localhost", 8000), "state": {}
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} responded with {message['status']}")
+
+    await app(scope, receive, send)
+
+
+async def measure(app: FastAPI, path: str, requests: int) -> float:
+    # Warm up
+    for _ in range(min(requests // 10, 500)):
+        await call(app, path)
+
+    start_time = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+
+    return (time.perf_counter() - start_time) / requests * 1_000_000
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Discard the request logs, Formatting still happens on the listener thread
+    log_listener.handlers[0].setStream(open(os.devnull, "w"))
+    log_listener.start()
+
+    cache = await create_cache_client()
+    api_client = create_client()
+    await cache_featured_movies(cache)
+
+    results = {}
+
+    for variant in ["none", "call_next", "asgi"]:
+        app = create_app(variant, cache, api_client)
+        results[variant] = [await measure(app, path, args.requests) for path in PATHS]
+
+    await api_client.aclose()
+    await cache.close()
+    log_listener.stop()
+
+    for index, path in enumerate(PATHS):
+        print(path)
+        for variant, timings in results.items():
+            overhead = timings[index] - results["none"][index]
+            print(f"  {variant:<10} {timings[index]:8.1f} us/request  (+{overhead:.1f} us)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per route and variant")
+
+    asyncio.run(main(parser.parse_args()))
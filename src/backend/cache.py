@@ -1,7 +1,234 @@
-import json
-from typing import Any
+import asyncio
+import hashlib
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator
 
+import orjson
 import redis.asyncio as redis
+from redis.commands.core import AsyncScript
+
+import cache_keys
+import env
+import metrics
+from codec import Codec
+
+# Delete a lock only if it is still held by the given token,
+# So that a caller never releases a lock which was acquired by someone else.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Expiry (in seconds) of a cache key, Or a function to derive it from the data being cached
+Expiry = int | Callable[[Any], int] | None
+
+# Keys which are stored along with the data of a key, i.e: Its ETag, freshness marker
+# and variants of the data (i.e: compressed by content encoding)
+COMPANION_KEYS = ["{}-etag", "{}-fresh", "{}-variants"]
+
+# Store a variant of the data of a key only if the data (by its ETag) hasn't changed meanwhile,
+# The variant expires along with the data.
+SET_VARIANT_SCRIPT = """
+if redis.call("get", KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+local ttl = redis.call("pttl", KEYS[1])
+if ttl == -2 then
+    return 0
+end
+redis.call("hset", KEYS[3], ARGV[2], ARGV[3])
+if ttl > 0 then
+    redis.call("pexpire", KEYS[3], ttl)
+end
+return 1
+"""
+
+# Redis pub/sub channel on which the keys to be dropped from in-process caches are broadcast
+INVALIDATION_CHANNEL = "cache-invalidation"
+
+# Keys which aren't built by the key builder end with their family (i.e: "jobs-ready"),
+# Family is used to label the metrics. Keys without one fall under "other".
+KEY_FAMILY_PATTERN = re.compile(r"(?:^|-)([a-z_]+)$")
+
+
+def get_key_family(key: str | int) -> str:
+    family = cache_keys.get_key_family(key)
+    if family:
+        return family
+
+    match = KEY_FAMILY_PATTERN.search(str(key))
+    return match.group(1) if match else "other"
+
+
+@contextmanager
+def track_command(operation: str, key: str | int) -> Iterator[None]:
+    """
+    Record duration and failure of the redis command(s) run within the block
+    """
+
+    family = get_key_family(key)
+    start_time = time.perf_counter()
+
+    try:
+        yield
+    except Exception:
+        metrics.REDIS_COMMAND_ERRORS.labels(operation=operation, family=family).inc()
+        raise
+    finally:
+        metrics.REDIS_COMMAND_DURATION.labels(operation=operation, family=family).observe(
+            time.perf_counter() - start_time
+        )
+
+
+def record_lookup(tier: str, key: str | int, is_hit: bool) -> None:
+    metrics.CACHE_REQUESTS.labels(tier=tier, family=get_key_family(key),
+                                  result="hit" if is_hit else "miss").inc()
+
+
+def get_etag(body: bytes) -> str:
+    """
+    Get strong ETag (HTTP validator) of the given serialized data
+    """
+
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def is_etag_matched(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check whether the given If-None-Match header matches the given ETag,
+    i.e: The client already has the same data.
+    """
+
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return etag in (value.strip().removeprefix("W/") for value in if_none_match.split(","))
+
+
+class CacheEntry:
+    """
+    Serialized (JSON) data of a key as it's stored, Along with its ETag which is computed
+    once when the data is cached. Variants of the data (i.e: compressed by content encoding)
+    are kept on the entry while it's in memory, And are stored in redis next to the data.
+
+    Body is None when it's not read at all, Since the client already has the data (by its ETag).
+    """
+
+    __slots__ = ("key", "body", "etag", "variants")
+
+    def __init__(self, key: str, body: bytes | None, etag: str | None = None) -> None:
+        self.key = key
+        self.body = body
+        self.etag = etag or get_etag(body)
+        self.variants: dict[str, bytes] = {}
+
+    @property
+    def size(self) -> int:
+        """
+        Size (in bytes) of the data along with its variants
+        """
+
+        return len(self.body or b"") + sum(map(len, self.variants.values()))
+
+
+class MemoryCache:
+    """
+    A bounded in-process LRU cache with per-key expiry,
+    Which evicts the least recently used keys once either
+    the max number of keys or the max size (in bytes) is exceeded.
+    """
+
+    def __init__(self, max_items: int = 1000, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        # Cached entries mapped as: key -> (expires at, size, value)
+        self.entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get number of keys and total size (in bytes) of the cached data
+        """
+
+        return {"keys": len(self.entries), "bytes": self.size}
+
+    def get(self, key: str) -> Any:
+        """
+        Retrieve data for a given key, None if it is missing or expired
+        """
+
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+
+        expires_at, _, value = entry
+
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, expiry: int) -> None:
+        """
+        Set data for a given key, Along with its size in bytes
+        """
+
+        if size > self.max_bytes:
+            return
+
+        self.delete(key)
+
+        self.entries[key] = (time.monotonic() + expiry, size, value)
+        self.size += size
+
+        self._evict()
+
+    def resize(self, key: str, value: Any, size: int) -> None:
+        """
+        Update size of the data for a given key, i.e: Once more data is kept on the cached value.
+        Nothing is done if the key holds another value by now.
+        """
+
+        entry = self.entries.get(key)
+        if not entry or entry[2] is not value:
+            return
+
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+
+        expires_at, previous_size, _ = entry
+        self.entries[key] = (expires_at, size, value)
+        self.size += size - previous_size
+
+        self._evict()
+
+    def _evict(self) -> None:
+        # Evict least recently used keys
+        while len(self.entries) > self.max_items or self.size > self.max_bytes:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def delete(self, key: str) -> None:
+        """
+        Delete data for a given key
+        """
+
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= entry[1]
 
 
 class CustomAsyncRedisClient:
@@ -9,64 +236,547 @@ class CustomAsyncRedisClient:
     A custom async redis client to support a default expiry,
     And automatically converting I/O data from redis using json library,
     Which is not provided by the main redis library.
+
+    A single instance is shared across the app, All requests borrow connections
+    from the same bounded connection pool.
+
+    Optionally a memory cache can be put in front of redis for hot shared keys,
+    Whose invalidations are broadcast to all the workers over redis pub/sub.
     """
 
-    def __init__(self, host: str, port: int, db: int = 0, expiry: int | None = None) -> None:
+    def __init__(self, host: str, port: int, db: int = 0, expiry: int | None = None,
+                 max_connections: int = 50, pool_timeout: float | None = 5,
+                 health_check_interval: int = 30, socket_timeout: float | None = None,
+                 socket_connect_timeout: float | None = None, lock_timeout: float = 10,
+                 lock_poll_interval: float = 0.05, local_cache: MemoryCache | None = None,
+                 codec: Codec | None = None) -> None:
         self.host = host
         self.port = port
         self.db = db
         self.expiry = expiry
 
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.health_check_interval = health_check_interval
+        self.socket_timeout = socket_timeout
+        self.socket_connect_timeout = socket_connect_timeout
+
+        self.lock_timeout = lock_timeout
+        self.lock_poll_interval = lock_poll_interval
+
+        # Format and compression of the stored data
+        self.codec = codec or Codec()
+
+        self.pool = None
         self.client = None
+        self.release_lock = None
+
+        # Lua scripts registered on the client, Mapped by their source
+        self.scripts: dict[str, AsyncScript] = {}
+
+        # Fetches which are currently in progress in this process, Mapped by their keys
+        self.inflight: dict[str, asyncio.Task] = {}
+
+        # Unique ID of this instance, To skip the invalidations broadcast by itself
+        self.local_cache = local_cache
+        self.instance_id = uuid.uuid4().hex
+        self.invalidation_listener = None
 
     async def connect(self):
         """
-        Create a async redis instance and add it as an attribute in client
+        Create a shared connection pool and an async redis instance on top of it,
+        And add them as attributes in pool and client
         """
 
-        self.client = await redis.Redis(
+        self.pool = redis.BlockingConnectionPool(
             host=self.host,
             port=self.port,
             db=self.db,
-            decode_responses=True
+            max_connections=self.max_connections,
+            timeout=self.pool_timeout,
+            health_check_interval=self.health_check_interval,
+            socket_timeout=self.socket_timeout,
+            socket_connect_timeout=self.socket_connect_timeout
         )
 
+        self.client = redis.Redis.from_pool(self.pool)
+        self.release_lock = self.client.register_script(RELEASE_LOCK_SCRIPT)
+
     async def close(self):
         """
-        Close the redis connection and set None in client attribute
+        Close the redis client along with its connection pool,
+        And set None in pool and client attributes
         """
 
-        await self.client.close()
+        if self.invalidation_listener:
+            self.invalidation_listener.cancel()
+            self.invalidation_listener = None
+
+        await self.client.aclose()
         self.client = None
+        self.pool = None
+        self.scripts.clear()
+
+    def get_script(self, source: str) -> AsyncScript:
+        """
+        Get the given Lua script registered on the client, It's only registered once
+        """
+
+        script = self.scripts.get(source)
+
+        if script is None:
+            script = self.scripts[source] = self.client.register_script(source)
+
+        return script
+
+    def get_pool_stats(self) -> dict[str, int]:
+        """
+        Get usage of the connection pool,
+        i.e: Active, idle connections and callers waiting for a connection.
+        """
+
+        if not self.pool:
+            return {"active": 0, "idle": 0, "waiting": 0}
+
+        waiters = getattr(self.pool._condition, "_waiters", None) or []
+
+        return {
+            "active": len(self.pool._in_use_connections),
+            "idle": len(self.pool._available_connections),
+            "waiting": len(waiters)
+        }
 
     async def get(self, key: str | int) -> Any:
         """
         Retrieve data for a given key
         """
 
-        value: dict | None = await self.client.get(key)
+        with track_command("get", key):
+            value: bytes | None = await self.client.get(key)
+
+        record_lookup("redis", key, bool(value))
 
         if value:
-            value = json.loads(value)
+            return self.codec.decode(value)
 
-        return value
+        return None
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        """
+        Retrieve data for the given keys in a single round trip,
+        None is returned in place of the missing keys.
+        """
+
+        if not keys:
+            return []
+
+        with track_command("get_many", keys[0]):
+            values = await self.client.mget(keys)
+
+        for key, value in zip(keys, values):
+            record_lookup("redis", key, bool(value))
+
+        return [self.codec.decode(value) if value else None for value in values]
+
+    async def _read(self, key: str, with_freshness: bool = False, variant: str | None = None,
+                    if_none_match: str | None = None) -> tuple[CacheEntry | None, bool]:
+        """
+        Retrieve serialized (JSON) data for a given key along with its ETag and freshness,
+        i.e: Whether its soft expiry has not passed yet. And the given variant of the data if it's stored.
+
+        With If-None-Match (of the client), The ETag is read first and the data is only read
+        if it doesn't match. Otherwise the entry is returned without its body.
+        """
+
+        if if_none_match:
+            with track_command("get_etag", key):
+                etag, is_fresh = await self.client.mget(f"{key}-etag", f"{key}-fresh")
+
+            if etag and is_etag_matched(if_none_match, etag.decode()):
+                return CacheEntry(key, None, etag.decode()), bool(is_fresh) or not with_freshness
+
+        with track_command("get", key):
+            variant_value = None
 
-    async def set(self, key: str | int, value: dict, expiry: int | None = 1800) -> None:
+            if variant is None:
+                value, etag, is_fresh = await self.client.mget(key, f"{key}-etag", f"{key}-fresh")
+            else:
+                async with self.client.pipeline(transaction=False) as pipe:
+                    pipe.mget(key, f"{key}-etag", f"{key}-fresh")
+                    pipe.hget(f"{key}-variants", variant)
+                    (value, etag, is_fresh), variant_value = await pipe.execute()
+
+        if not value:
+            return None, False
+
+        # Entries cached before the ETags were stored get one computed on read
+        entry = CacheEntry(key, self.codec.decode_json(value), etag.decode() if etag else None)
+
+        if variant_value is not None:
+            entry.variants[variant] = variant_value
+
+        return entry, bool(is_fresh) or not with_freshness
+
+    async def get_freshness(self, key: str) -> int:
+        """
+        Get remaining time (in seconds) till the soft expiry of a given key, 0 once it's stale
+        """
+
+        with track_command("get_freshness", key):
+            ttl = await self.client.ttl(f"{key}-fresh")
+
+        return max(ttl, 0)
+
+    async def set_variant(self, entry: CacheEntry, name: str, value: bytes) -> None:
+        """
+        Keep a variant of the data of the given entry (i.e: compressed by content encoding),
+        And store it in redis along with the data. So it's built once, Instead of on every request.
+        """
+
+        entry.variants[name] = value
+
+        # The entry might be kept in the memory cache, Which should account for the variant as well
+        if self.local_cache is not None:
+            self.local_cache.resize(entry.key, entry, entry.size)
+
+        with track_command("set_variant", entry.key):
+            await self.get_script(SET_VARIANT_SCRIPT)(
+                keys=[entry.key, f"{entry.key}-etag", f"{entry.key}-variants"],
+                args=[entry.etag, name, value]
+            )
+
+    async def set(self, key: str | int, value: dict, expiry: int | None = 1800,
+                  soft_expiry: int | None = None) -> None:
+        """
+        Set data for a given key,
+        With a soft expiry the data is considered stale once it passes.
+        """
+
+        await self._write(key, self.codec.encode(value), expiry, soft_expiry)
+
+    async def set_many(self, mapping: dict[str, Any], expiry: int | None = 1800) -> None:
         """
-        Set data for a given key
+        Set data for the given keys in a single round trip
         """
 
+        if not mapping:
+            return
+
         if expiry == 0:
             expiry = None
         elif expiry is None:
             expiry = self.expiry
 
-        value = json.dumps(value)
-        await self.client.set(key, value, ex=expiry)
+        # MSET doesn't support an expiry, So pipeline the individual SET commands instead
+        with track_command("set_many", next(iter(mapping))):
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, self.codec.encode(value), ex=expiry)
+                    pipe.delete(*(companion.format(key) for companion in COMPANION_KEYS))
+
+                await pipe.execute()
+
+    async def _write(self, key: str, value: bytes, expiry: int | None,
+                     soft_expiry: int | None, etag: str | None = None) -> None:
+        """
+        Set already encoded data for a given key, Along with its ETag if given
+        """
+
+        if expiry == 0:
+            expiry = None
+        elif expiry is None:
+            expiry = self.expiry
+
+        with track_command("set", key):
+            # Keep the ETag and a marker key which lives till the soft expiry,
+            # Along with the data which lives till the hard expiry.
+            # The ones which aren't given are cleared, So they don't outlive the previous data.
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(key, value, ex=expiry)
+
+                if etag:
+                    pipe.set(f"{key}-etag", etag, ex=expiry)
+                else:
+                    pipe.delete(f"{key}-etag")
+
+                if soft_expiry:
+                    pipe.set(f"{key}-fresh", 1, ex=soft_expiry)
+                else:
+                    pipe.delete(f"{key}-fresh")
+
+                # Variants of the previous data
+                pipe.delete(f"{key}-variants")
+
+                await pipe.execute()
 
     async def delete(self, key: str | int) -> Any:
         """
-        Delete data for a given key
+        Delete data for a given key along with its companion keys
+        """
+
+        # Only the families which are kept in memory need to be dropped from the workers
+        family = cache_keys.get_family(key)
+        if family is not None and family.local_expiry is not None:
+            await self.invalidate_local(key)
+
+        with track_command("delete", key):
+            return await self.client.delete(key, *(companion.format(key) for companion in COMPANION_KEYS))
+
+    async def invalidate_local(self, key: str) -> None:
+        """
+        Drop a given key from the memory cache of all the workers
+        """
+
+        if not self.local_cache:
+            return
+
+        self.local_cache.delete(key)
+        await self.client.publish(INVALIDATION_CHANNEL, f"{self.instance_id}:{key}")
+
+    def start_invalidation_listener(self) -> None:
+        """
+        Start listening for the keys to be dropped from the memory cache in the background
+        """
+
+        if self.local_cache and not self.invalidation_listener:
+            self.invalidation_listener = asyncio.create_task(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self) -> None:
+        """
+        Drop the keys broadcast by other workers from the memory cache,
+        Resubscribe if the pub/sub connection gets broken.
+        """
+
+        while True:
+            try:
+                async with self.client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+
+                    while True:
+                        message = await pubsub.get_message(timeout=1.0)
+                        if not message:
+                            continue
+
+                        instance_id, key = message["data"].decode("utf-8").split(":", 1)
+                        if instance_id != self.instance_id:
+                            self.local_cache.delete(key)
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception:
+                # Entries missed while disconnected can't be tracked,
+                # So start afresh to avoid serving invalidated data.
+                self.local_cache.entries.clear()
+                self.local_cache.size = 0
+                await asyncio.sleep(1)
+
+    async def get_or_set(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                         expiry: Expiry = 1800, soft_expiry: Expiry = None,
+                         local_expiry: int | None = None) -> Any:
+        """
+        Retrieve data for a given key, And on a miss load it using the given fetch function.
+        See get_or_set_entry for the details.
+        """
+
+        return orjson.loads(await self.get_or_set_raw(key, fetch, expiry, soft_expiry, local_expiry))
+
+    async def get_or_set_raw(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                             expiry: Expiry = 1800, soft_expiry: Expiry = None,
+                             local_expiry: int | None = None) -> bytes:
+        """
+        Retrieve serialized (JSON) data for a given key as it's stored, So it can be sent
+        in a response without parsing it. See get_or_set_entry for the details.
+        """
+
+        entry = await self.get_or_set_entry(key, fetch, expiry, soft_expiry, local_expiry)
+        return entry.body
+
+    async def get_or_set_entry(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                               expiry: Expiry = 1800, soft_expiry: Expiry = None,
+                               local_expiry: int | None = None, variant: str | None = None,
+                               if_none_match: str | None = None) -> CacheEntry:
+        """
+        Retrieve serialized (JSON) data for a given key along with its ETag,
+        On a miss load it using the given fetch function.
+
+        The given variant of the data (i.e: compressed by content encoding)
+        is also retrieved if it's stored, See set_variant. With If-None-Match of the client,
+        The data stored in redis is not read if the client already has it, See _read.
+
+        Concurrent misses for the same key are coalesced, So only a single fetch
+        goes upstream and all the callers get the same result.
+
+        With a soft expiry, Stale data is returned right away while it gets
+        refreshed in the background. Only data past its hard expiry is a miss.
+
+        With a local expiry, Data is also kept in the memory cache for that duration.
+        """
+
+        use_local_cache = self.local_cache is not None and local_expiry is not None
+
+        if use_local_cache:
+            entry = self.local_cache.get(key)
+            record_lookup("local", key, entry is not None)
+
+            if entry is not None:
+                return entry
+
+        entry, is_fresh = await self._read(key, with_freshness=soft_expiry is not None, variant=variant,
+                                           if_none_match=if_none_match)
+        record_lookup("redis", key, entry is not None)
+
+        if entry is not None:
+            if not is_fresh:
+                self._refresh(key, fetch, expiry, soft_expiry, local_expiry)
+            elif use_local_cache and entry.body is not None:
+                self.local_cache.set(key, entry, entry.size, local_expiry)
+
+            return entry
+
+        # Join the fetch which is already in progress for this key in the current process
+        task = self.inflight.get(key)
+
+        if not task:
+            task = asyncio.create_task(self._load(key, fetch, expiry, soft_expiry, local_expiry))
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+            self.inflight[key] = task
+
+        # Shield the shared fetch, So that a cancelled caller doesn't cancel it for others
+        return await asyncio.shield(task)
+
+    def _refresh(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                 expiry: Expiry, soft_expiry: Expiry, local_expiry: int | None) -> None:
+        """
+        Refresh stale data for a given key in the background,
+        Unless a refresh is already in progress for it in the current process.
+        """
+
+        refresh_key = f"{key}-refresh"
+
+        if refresh_key in self.inflight:
+            return
+
+        def on_done(task: asyncio.Task) -> None:
+            self.inflight.pop(refresh_key, None)
+
+            # Stale data keeps getting served if the refresh fails,
+            # It will be retried by the next request.
+            if not task.cancelled():
+                task.exception()
+
+        task = asyncio.create_task(self._load(key, fetch, expiry, soft_expiry,
+                                              local_expiry, is_refresh=True))
+        task.add_done_callback(on_done)
+        self.inflight[refresh_key] = task
+
+    async def _load(self, key: str, fetch: Callable[[], Awaitable[Any]], expiry: Expiry,
+                    soft_expiry: Expiry, local_expiry: int | None,
+                    is_refresh: bool = False) -> CacheEntry | None:
         """
+        Fetch and cache data for a given key while holding a redis lock,
+        Or wait for the worker who is holding the lock to cache it.
+        Return the cached entry.
+        """
+
+        lock_key = f"{key}-lock"
+        token = uuid.uuid4().hex
+
+        is_locked = await self.client.set(lock_key, token, nx=True,
+                                          px=int(self.lock_timeout * 1000))
+
+        if not is_locked:
+            # Some other worker is already refreshing the stale data
+            if is_refresh:
+                return None
+
+            entry = await self._wait_for_lock(key, lock_key)
+            if entry is not None:
+                return entry
+
+        try:
+            # The key might have been cached (or refreshed) while we were acquiring the lock
+            entry, is_fresh = await self._read(key, with_freshness=soft_expiry is not None)
+
+            if is_refresh and not is_fresh:
+                entry = None
+
+            if entry is None:
+                data = await fetch()
+                entry = CacheEntry(key, orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS))
+
+                # Data is kept as JSON (even if the codec uses another format) so it can be sent as it is
+                await self._write(key, self.codec.encode_json(entry.body),
+                                  expiry(data) if callable(expiry) else expiry,
+                                  soft_expiry(data) if callable(soft_expiry) else soft_expiry,
+                                  etag=entry.etag)
+
+                # Other workers might be holding the previous data in their memory cache
+                if local_expiry is not None:
+                    await self.invalidate_local(key)
+
+            if self.local_cache and local_expiry is not None:
+                self.local_cache.set(key, entry, entry.size, local_expiry)
+
+            return entry
+
+        finally:
+            if is_locked:
+                await self.release_lock(keys=[lock_key], args=[token])
+
+    async def _wait_for_lock(self, key: str, lock_key: str) -> CacheEntry | None:
+        """
+        Poll the cache until the lock holder caches the data for the given key,
+        Return None if the lock gets released or expires without it.
+        """
+
+        deadline = asyncio.get_running_loop().time() + self.lock_timeout
+
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+
+            entry, _ = await self._read(key)
+            if entry is not None:
+                return entry
+
+            if not await self.client.exists(lock_key):
+                break
+
+        return None
+
+
+async def create_cache_client() -> CustomAsyncRedisClient:
+    """
+    Create the app-wide redis client instance,
+    Backed by a single connection pool shared across requests.
+    """
+
+    host = env.REDIS_HOST
+    port = env.REDIS_PORT
+
+    if not host or not port:
+        raise KeyError("Cache credentials are not configured in env")
+
+    cache = CustomAsyncRedisClient(
+        host=host,
+        port=int(port),
+        max_connections=env.REDIS_MAX_CONNECTIONS,
+        pool_timeout=env.REDIS_POOL_TIMEOUT,
+        health_check_interval=env.REDIS_HEALTH_CHECK_INTERVAL,
+        socket_timeout=env.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=env.REDIS_SOCKET_CONNECT_TIMEOUT,
+        lock_timeout=env.REDIS_LOCK_TIMEOUT,
+        local_cache=MemoryCache(
+            max_items=env.CACHE_LOCAL_MAX_ITEMS,
+            max_bytes=env.CACHE_LOCAL_MAX_BYTES
+        ) if env.CACHE_LOCAL_ENABLED else None,
+        codec=Codec(
+            format=env.CACHE_FORMAT,
+            compression=env.CACHE_COMPRESSION,
+            compression_threshold=env.CACHE_COMPRESSION_THRESHOLD,
+            compression_level=env.CACHE_COMPRESSION_LEVEL
+        )
+    )
+    await cache.connect()
 
-        return await self.client.delete(key)
+    return cache
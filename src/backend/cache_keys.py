@@ -0,0 +1,157 @@
+"""
+Centralize place to build cache keys and their expiry, Which will be used across the project.
+
+Keys are built as: {namespace}:{family}:v{version}:{vary values...} (i.e: "watcher:detail:v1:550"),
+Bumping the version of a family (in code or with CACHE_KEY_VERSIONS env) switches all its
+readers and writers to new keys at once, So the old entries are never read again and
+just expire on their own. No SCAN or delete is needed.
+"""
+
+import hashlib
+import random
+from typing import Any
+from urllib.parse import quote
+
+import env
+
+# Normalized values longer than this are hashed, To keep the keys short
+MAX_VALUE_LENGTH = 64
+
+# Key families mapped by their names
+FAMILIES: dict[str, "CacheKeyFamily"] = {}
+
+# Per family version overrides from env, i.e: "detail=2,search=3"
+VERSION_OVERRIDES = {
+    name.strip(): int(version)
+    for name, version in (
+        item.split("=", 1) for item in env.CACHE_KEY_VERSIONS.split(",") if "=" in item
+    )
+}
+
+
+def normalize_value(value: Any) -> str:
+    """
+    Normalize a vary value, So that the equivalent values share a key.
+    i.e: Search queries are lowercased and their whitespaces are collapsed.
+    """
+
+    if value is None:
+        return ""
+
+    if isinstance(value, bool):
+        return "1" if value else "0"
+
+    value = quote(" ".join(str(value).lower().split()), safe="")
+
+    if len(value) > MAX_VALUE_LENGTH:
+        return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+    return value
+
+
+def add_jitter(expiry: int | None) -> int | None:
+    """
+    Randomly spread the given expiry (by CACHE_EXPIRY_JITTER ratio),
+    So the keys written together don't expire together.
+    """
+
+    if not expiry:
+        return expiry
+
+    ratio = random.uniform(1 - env.CACHE_EXPIRY_JITTER, 1 + env.CACHE_EXPIRY_JITTER)
+    return max(1, round(expiry * ratio))
+
+
+class CacheKeyFamily:
+    """
+    A family of cache keys along with its expiry policy,
+    Keys vary by the given dimensions and all of them must be passed to build a key.
+
+    Expiry is the hard expiry of the data, Soft expiry (if any) is the duration after which
+    the data is served stale while it gets refreshed, And local expiry (if any) is the duration
+    for which the data is also kept in the memory of each worker. Both the hard and soft expiry
+    are randomly spread, Unless jitter is disabled.
+    """
+
+    def __init__(self, name: str, version: int = 1, vary: tuple[str, ...] = (),
+                 expiry: int | None = 1800, soft_expiry: int | None = None,
+                 local_expiry: int | None = None, jitter: bool = True) -> None:
+        self.name = name
+        self.version = VERSION_OVERRIDES.get(name, version)
+        self.vary = vary
+
+        self._expiry = expiry
+        self._soft_expiry = soft_expiry
+        self.local_expiry = local_expiry
+        self.jitter = jitter
+
+        FAMILIES[name] = self
+
+    @property
+    def prefix(self) -> str:
+        return f"{env.CACHE_NAMESPACE}:{self.name}:v{self.version}"
+
+    @property
+    def expiry(self) -> int | None:
+        return add_jitter(self._expiry) if self.jitter else self._expiry
+
+    @property
+    def soft_expiry(self) -> int | None:
+        return add_jitter(self._soft_expiry) if self.jitter else self._soft_expiry
+
+    def key(self, **values: Any) -> str:
+        """
+        Build the key for the given vary values
+        """
+
+        if set(values) != set(self.vary):
+            raise KeyError(f"Cache key family {self.name} varies by: {', '.join(self.vary)}")
+
+        return ":".join([self.prefix, *(normalize_value(values[name]) for name in self.vary)])
+
+
+def get_key_family(key: str | int) -> str | None:
+    """
+    Get family of a key built by the key builder, None for any other key
+    """
+
+    parts = str(key).split(":", 2)
+
+    if len(parts) < 3 or parts[0] != env.CACHE_NAMESPACE:
+        return None
+
+    return parts[1]
+
+
+def get_family(key: str | int) -> CacheKeyFamily | None:
+    """
+    Get family of a key built by the key builder, None for any other key
+    """
+
+    return FAMILIES.get(get_key_family(key))
+
+
+# Movie genres barely ever change
+GENRES = CacheKeyFamily("genres", expiry=7 * 86400, soft_expiry=86400, local_expiry=600)
+
+# Featured movies include the movies which are now playing, So they're refreshed every few minutes
+FEATURED_MOVIES = CacheKeyFamily("featured_movies", expiry=86400, soft_expiry=600, local_expiry=60)
+
+# Listings and movie details also vary by the selected fields (a preset name or the sorted fields)
+MOVIES_BY_GENRE = CacheKeyFamily("movies_by_genre", vary=("genre_id", "page", "include_adult", "fields"),
+                                 expiry=3600)
+
+SEARCH = CacheKeyFamily("search", vary=("query", "page", "include_adult", "fields"), expiry=1800)
+
+MOVIE_DETAIL = CacheKeyFamily("detail", vary=("movie_id", "fields"), expiry=86400, soft_expiry=3600)
+
+# Top level movie details which are returned along with the watchlist items
+WATCHLIST_MOVIE_DETAIL = CacheKeyFamily("watchlist_movie_detail", vary=("movie_id",), expiry=86400)
+
+FAVORITE = CacheKeyFamily("favorite", vary=("user_id", "movie_id"), expiry=1800)
+
+USER = CacheKeyFamily("user", vary=("user_id",), expiry=env.USER_CACHE_EXPIRY,
+                      local_expiry=env.USER_LOCAL_CACHE_EXPIRY)
+
+# Users whose reads are kept on the primary DB for a while after they write something
+STICKY = CacheKeyFamily("sticky", vary=("user_id",), expiry=env.DB_REPLICA_STICKY_SECONDS, jitter=False)
@@ -1,6 +1,97 @@
-from httpx import AsyncClient
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Collection
+
+import ijson
+from fastapi import Request
+from httpx import AsyncClient, Limits, Response, Timeout
 
 import env
+import metrics
+
+# IDs in the endpoint paths, To label metrics by endpoint template (i.e: /movie/{id})
+ID_PATTERN = re.compile(r"/\d+(?=/|$)")
+
+
+def get_endpoint_template(endpoint: str) -> str:
+    return ID_PATTERN.sub("/{id}", endpoint)
+
+
+class ResponseTooLarge(Exception):
+    """
+    Raised when a streamed response exceeds the max allowed size
+    """
+
+
+class ResponseReader:
+    """
+    Async file like reader over the body of a streamed response, For the incremental JSON parser.
+    Fails once more than the max bytes are read, So a huge response is never fully read.
+    """
+
+    def __init__(self, response: Response, max_bytes: int) -> None:
+        self.chunks = response.aiter_bytes()
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise ResponseTooLarge(f"Response of {content_length} bytes exceeds {max_bytes} bytes")
+
+    async def read(self, size: int = -1) -> bytes:
+        # The parser reads nothing at first, To tell whether the reader returns bytes or str
+        if size == 0:
+            return b""
+
+        async for chunk in self.chunks:
+            if not chunk:
+                continue
+
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise ResponseTooLarge(f"Response exceeds {self.max_bytes} bytes")
+
+            return chunk
+
+        return b""
+
+
+async def parse_objects(events: AsyncIterator[tuple[str, str, Any]], prefix: str,
+                        fields: Collection[str] | None = None) -> AsyncIterator[dict[str, Any]]:
+    """
+    Build the JSON objects at the given prefix (i.e: "" for the top level object, "results.item"
+    for each of the results) from the parser events, With only the given fields (all if None).
+    Values of the other fields are skipped without being built.
+    """
+
+    data = None
+    key = None
+    builder = None
+
+    def store() -> None:
+        if builder is not None:
+            data[key] = builder.value
+
+    async for current, event, value in events:
+        # Events of a field value
+        if current != prefix:
+            if builder is not None:
+                builder.event(event, value)
+            continue
+
+        if event == "start_map":
+            data, builder = {}, None
+
+        elif event == "map_key" and data is not None:
+            store()
+            key = value
+            builder = ijson.ObjectBuilder() if fields is None or key in fields else None
+
+        elif event == "end_map" and data is not None:
+            store()
+            yield data
+            data, builder = None, None
 
 
 class CustomAsyncClient(AsyncClient):
@@ -10,7 +101,8 @@ class CustomAsyncClient(AsyncClient):
     to the MovieDB service.
     """
 
-    def __init__(self, url: str, token: str):
+    def __init__(self, url: str, token: str, limits: Limits | None = None,
+                 timeout: Timeout | None = None, http2: bool = False):
         self.token = token
         self.url = url
         self.headers = {
@@ -19,19 +111,117 @@ class CustomAsyncClient(AsyncClient):
             "Authorization": f"Bearer {token}"
         }
 
-        super().__init__(headers=self.headers)
+        kwargs = {"http2": http2}
+        if limits:
+            kwargs["limits"] = limits
+        if timeout:
+            kwargs["timeout"] = timeout
+
+        super().__init__(headers=self.headers, **kwargs)
 
     def get_absolute_url(self, endpoint: str) -> str:
         return self.url + endpoint
 
     async def get(self, endpoint: str, params: dict[str, str] | None = None):
         url = self.get_absolute_url(endpoint)
-        return await super().get(url=url, params=params)
 
+        # Record the request status and duration, Failed requests (i.e: timeouts) are recorded as error
+        status = "error"
+        start_time = time.perf_counter()
+
+        try:
+            response = await super().get(url=url, params=params)
+            status = str(response.status_code)
+            return response
 
-async def get_client():
+        finally:
+            self.record_request(endpoint, status, start_time)
+
+    @asynccontextmanager
+    async def stream_get(self, endpoint: str, params: dict[str, str] | None = None) -> AsyncIterator[Response]:
+        """
+        Send a GET request whose body is read while it's being streamed, Instead of all at once.
+        The request is recorded once its body is consumed.
+        """
+
+        url = self.get_absolute_url(endpoint)
+
+        status = "error"
+        start_time = time.perf_counter()
+
+        try:
+            async with self.stream("GET", url=url, params=params) as response:
+                status = str(response.status_code)
+                yield response
+
+        finally:
+            self.record_request(endpoint, status, start_time)
+
+    async def get_fields(self, endpoint: str, fields: Collection[str], params: dict[str, str] | None = None,
+                         max_bytes: int = env.MOVIE_DB_MAX_RESPONSE_BYTES) -> dict[str, Any]:
+        """
+        Get only the given top level fields of a JSON object response, The response is parsed
+        while it's streamed so the other fields are never built in memory.
+        """
+
+        async with self.stream_get(endpoint, params) as response:
+            response.raise_for_status()
+
+            events = ijson.parse_async(ResponseReader(response, max_bytes), use_float=True)
+
+            async for data in parse_objects(events, "", fields):
+                return data
+
+        raise ValueError(f"Response of {endpoint} is not a JSON object")
+
+    async def get_items(self, endpoint: str, prefix: str, fields: Collection[str] | None = None,
+                        params: dict[str, str] | None = None,
+                        max_bytes: int = env.MOVIE_DB_MAX_RESPONSE_BYTES) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yield the objects at the given prefix of a JSON response (i.e: "results.item") one by one,
+        With only the given fields (all if None). The response is parsed while it's streamed,
+        So only the objects kept by the caller stay in memory.
+        """
+
+        async with self.stream_get(endpoint, params) as response:
+            response.raise_for_status()
+
+            events = ijson.parse_async(ResponseReader(response, max_bytes), use_float=True)
+
+            async for data in parse_objects(events, prefix, fields):
+                yield data
+
+    def record_request(self, endpoint: str, status: str, start_time: float) -> None:
+        template = get_endpoint_template(endpoint)
+        metrics.MOVIE_DB_REQUESTS.labels(endpoint=template, status=status).inc()
+        metrics.MOVIE_DB_REQUEST_DURATION.labels(endpoint=template, status=status).observe(
+            time.perf_counter() - start_time
+        )
+
+    def get_pool_stats(self) -> dict[str, int]:
+        """
+        Get usage of the underlying connection pool,
+        i.e: Active, idle connections and requests waiting for a connection.
+        """
+
+        pool = getattr(self._transport, "_pool", None)
+        connections = getattr(pool, "connections", [])
+        requests = getattr(pool, "_requests", [])
+
+        idle = sum(1 for connection in connections if connection.is_idle())
+        waiting = sum(1 for request in requests if request.is_queued())
+
+        return {
+            "active": len(connections) - idle,
+            "idle": idle,
+            "waiting": waiting
+        }
+
+
+def create_client() -> CustomAsyncClient:
     """
-    Get custom API client instance
+    Create the app-wide API client instance,
+    Which keeps connections to the MovieDB service alive across requests.
     """
 
     base_url = env.MOVIE_DB_BASE_URL
@@ -40,9 +230,25 @@ async def get_client():
     if not base_url or not token:
         raise KeyError("MovieDB credentials are not configured in env")
 
-    try:
-        client = CustomAsyncClient(base_url, token)
-        yield client
-    except Exception:
-        await client.aclose()
-        raise
+    limits = Limits(
+        max_connections=env.MOVIE_DB_MAX_CONNECTIONS,
+        max_keepalive_connections=env.MOVIE_DB_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=env.MOVIE_DB_KEEPALIVE_EXPIRY
+    )
+
+    timeout = Timeout(
+        env.MOVIE_DB_TIMEOUT,
+        connect=env.MOVIE_DB_CONNECT_TIMEOUT,
+        pool=env.MOVIE_DB_POOL_TIMEOUT
+    )
+
+    return CustomAsyncClient(base_url, token, limits=limits,
+                             timeout=timeout, http2=env.MOVIE_DB_HTTP2)
+
+
+async def get_client(request: Request) -> CustomAsyncClient:
+    """
+    Get the app-wide API client instance
+    """
+
+    return request.app.state.api_client
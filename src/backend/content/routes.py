@@ -1,228 +1,317 @@
+import asyncio
+import heapq
 import uuid
+from contextlib import aclosing
+from functools import partial
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import cache_keys
+import env
 import strings
 from cache import CustomAsyncRedisClient
 from dependencies import get_user, get_cache_client, get_async_db_session
 
 from user.models import User
 from content.api_client import CustomAsyncClient, get_client
+from content.utils import (
+    Fields,
+    cached_json_response,
+    get_listing_fields,
+    get_movie_fields,
+    get_or_set_projection,
+    get_response_variant,
+    project_listing,
+    project_movie
+)
 from watchlist.queries import is_watchlist_item_exists
 
 router = APIRouter()
 
+# Cache-Control of the responses shared by all users, Browsers may reuse them for a while
+# and revalidate them (with their ETag) in the background once they get stale.
+GENRES_CACHE_CONTROL = "public, max-age=3600, stale-while-revalidate=86400"
+FEATURED_MOVIES_CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=600"
+
+# Cache-Control of the responses which depend on the user (i.e: their age), Which can only be
+# kept by the browser. Movie details include per-user fields so they're always revalidated.
+MOVIES_CACHE_CONTROL = "private, max-age=300"
+MOVIE_DETAIL_CACHE_CONTROL = "private, no-cache"
+
+# Sections of the featured movies response, Mapped with their MovieDB endpoints
+FEATURED_SECTIONS = {
+    "now_playing": "/movie/now_playing",
+    "popular": "/movie/popular",
+    "top_rated": "/movie/top_rated",
+    "upcoming": "/movie/upcoming"
+}
+
+# Max number of the most popular movies kept in a section, i.e: Top 5 movies currently playing in theaters
+FEATURED_SECTION_LIMITS = {
+    "now_playing": 5
+}
+
+
+async def fetch_movies_section(client: CustomAsyncClient, endpoint: str, limit: int | None = None) -> list[dict]:
+    """
+    Fetch a list of movies from the given MovieDB endpoint, Giving up if the section
+    takes longer than the configured timeout.
+
+    Movies are parsed one by one while the response is streamed, With a limit only
+    that many of the most popular ones are kept.
+    """
+
+    async def fetch() -> list[dict]:
+        # Close the streamed response right away if the parsing stops early (i.e: on the timeout)
+        async with aclosing(client.get_items(endpoint=endpoint, prefix="results.item")) as movies:
+            if limit is None:
+                return [movie async for movie in movies]
+
+            # Min heap of the most popular movies so far, Earlier movies win the ties
+            top_movies: list[tuple[float, int, dict]] = []
+            position = 0
+
+            async for movie in movies:
+                position += 1
+                item = (movie.get("popularity") or 0, -position, movie)
+
+                if len(top_movies) < limit:
+                    heapq.heappush(top_movies, item)
+                else:
+                    heapq.heappushpop(top_movies, item)
+
+        return [movie for *_, movie in sorted(top_movies, reverse=True)]
+
+    return await asyncio.wait_for(fetch(), timeout=env.FEATURED_SECTION_TIMEOUT)
+
+
+async def fetch_featured_movies(client: CustomAsyncClient, failed_sections: set[str]) -> dict:
+    """
+    Fetch featured movies from the MovieDB service, All the sections are fetched
+    concurrently instead of waiting on MovieDB one section at a time.
+    Names of the sections which failed (and are left empty) are added in the given set.
+    """
+
+    sections = await asyncio.gather(*(
+        fetch_movies_section(client, endpoint, FEATURED_SECTION_LIMITS.get(name))
+        for name, endpoint in FEATURED_SECTIONS.items()
+    ), return_exceptions=True)
+
+    data = {}
+
+    for name, section in zip(FEATURED_SECTIONS, sections):
+        if isinstance(section, Exception):
+            failed_sections.add(name)
+            section = []
+
+        data[name] = section
+
+    if len(failed_sections) == len(FEATURED_SECTIONS):
+        raise sections[0]
+
+    return data
+
+
+def get_featured_movies_expiry(failed_sections: set[str]) -> int:
+    """
+    Get soft cache expiry of the featured movies, A partial response (with a failed section)
+    gets stale sooner so that the failed sections are retried soon.
+    A section which is just empty (i.e: no upcoming movies) is not a failure.
+    """
+
+    if not failed_sections:
+        return cache_keys.FEATURED_MOVIES.soft_expiry
+
+    return cache_keys.add_jitter(env.FEATURED_PARTIAL_CACHE_EXPIRY)
+
 
 @router.get("/genres/")
 async def get_genres(
+    request: Request,
     client: Annotated[CustomAsyncClient, Depends(get_client)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)]
-) -> JSONResponse:
+) -> Response:
     """
     Get list of genres from the movieDB service.
     """
 
-    async with client:
-        try:
-            key = "genres"
-
-            data: dict | None = await cache.get(key)
-
-            if not data:
-                response = await client.get(endpoint="/genre/movie/list")
-                data = response.json().get("genres", [])
+    try:
+        async def fetch_genres() -> list[dict]:
+            response = await client.get(endpoint="/genre/movie/list")
+            return response.json().get("genres", [])
 
-                # Save response in cache
-                await cache.set(key, data)
+        entry = await cache.get_or_set_entry(cache_keys.GENRES.key(), fetch_genres,
+                                             expiry=cache_keys.GENRES.expiry,
+                                             soft_expiry=cache_keys.GENRES.soft_expiry,
+                                             local_expiry=cache_keys.GENRES.local_expiry,
+                                             variant=get_response_variant(request),
+                                             if_none_match=request.headers.get("if-none-match"))
 
-            return JSONResponse(data, status_code=status.HTTP_200_OK)
+        return await cached_json_response(request, cache, entry, GENRES_CACHE_CONTROL)
 
-        except Exception as e:
-            raise HTTPException(detail=str(
-                e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
+    except Exception as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
 
 
 @router.get("/featured-movies/")
 async def get_recommended_movies_by_genres(
+    request: Request,
     client: Annotated[CustomAsyncClient, Depends(get_client)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)]
-) -> JSONResponse:
+) -> Response:
     """
     Get featured movies from movieDB service, which is the combination of:
     now playing, popular, top rated and upcoming movies.
     """
 
-    async with client:
-        try:
-            key = "featured_movies"
-
-            data: dict | None = await cache.get(key)
-
-            if not data:
-                # Fetch movies which are currently playing in theaters
-                response = await client.get(endpoint="/movie/now_playing")
-                now_playing = response.json().get("results", [])
-
-                now_playing.sort(key=lambda x: x["popularity"],
-                                 reverse=True)
-
-                # Fetch movies which are popular
-                response = await client.get(endpoint="/movie/popular")
-                popular = response.json().get("results", [])
-
-                # Fetch top rated movies
-                response = await client.get(endpoint="/movie/top_rated")
-                top_rated = response.json().get("results", [])
-
-                # Fetch upcoming movies
-                response = await client.get(endpoint="/movie/upcoming")
-                upcoming = response.json().get("results", [])
-
-                data = {
-                    "now_playing": now_playing[:5],
-                    "popular": popular,
-                    "top_rated": top_rated,
-                    "upcoming": upcoming
-                }
+    try:
+        # Sections which failed in the fetch, Which decide the soft expiry of the fetched data
+        failed_sections: set[str] = set()
 
-                # Save response in cache
-                await cache.set(key, data)
+        entry = await cache.get_or_set_entry(cache_keys.FEATURED_MOVIES.key(),
+                                             partial(fetch_featured_movies, client, failed_sections),
+                                             expiry=cache_keys.FEATURED_MOVIES.expiry,
+                                             soft_expiry=lambda _: get_featured_movies_expiry(failed_sections),
+                                             local_expiry=cache_keys.FEATURED_MOVIES.local_expiry,
+                                             variant=get_response_variant(request),
+                                             if_none_match=request.headers.get("if-none-match"))
 
-            return JSONResponse(data, status_code=status.HTTP_200_OK)
+        return await cached_json_response(request, cache, entry, FEATURED_MOVIES_CACHE_CONTROL)
 
-        except Exception as e:
-            raise HTTPException(detail=str(
-                e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
+    except Exception as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
 
 
 @router.get("/genre/{genre_id}/")
 async def get_movies_by_genre(
+    request: Request,
     client: Annotated[CustomAsyncClient, Depends(get_client)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)],
     genre_id: int,
+    fields: Annotated[Fields, Depends(get_listing_fields)],
     page: int = 1,
     user: Annotated[User | None, Depends(get_user)] = None
-) -> JSONResponse:
+) -> Response:
     """
     Get movies based on the given genre_id.
+    Fields of the movies can be selected with a preset (card or full) or comma separated fields.
     """
 
-    async with client:
-        try:
-            key = f"{genre_id}-{page}-movies_by_genre"
-
-            data: dict | None = await cache.get(key)
-
-            if not data:
-                # Include mature or R-rated movies if user is authenticated
-                # And is at least 18 years old.
-                include_adult = user and user.age >= 18
+    try:
+        # Include mature or R-rated movies if user is authenticated
+        # And is at least 18 years old.
+        include_adult = bool(user and user.age >= 18)
 
-                response = await client.get(endpoint="/discover/movie",
-                                            params={"with_genres": genre_id, "page": page, "include_adult": include_adult})
-                data = response.json()
+        async def fetch_movies() -> dict:
+            response = await client.get(endpoint="/discover/movie",
+                                        params={"with_genres": genre_id, "page": page, "include_adult": include_adult})
+            return response.json()
 
-                # Save response in DB
-                await cache.set(key, data)
+        entry = await get_or_set_projection(cache, cache_keys.MOVIES_BY_GENRE, fetch_movies, fields,
+                                            project_listing, genre_id=genre_id, page=page,
+                                            include_adult=include_adult,
+                                            variant=get_response_variant(request),
+                                            if_none_match=request.headers.get("if-none-match"))
 
-            return JSONResponse(data, status_code=status.HTTP_200_OK)
+        return await cached_json_response(request, cache, entry, MOVIES_CACHE_CONTROL, vary="Authorization")
 
-        except Exception as e:
-            raise HTTPException(detail=str(
-                e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
+    except Exception as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
 
 
 @router.get("/detail/{movie_id}/")
 async def get_movie_details(
+    request: Request,
     client: Annotated[CustomAsyncClient, Depends(get_client)],
     session: Annotated[AsyncSession, Depends(get_async_db_session)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)],
     movie_id: int,
+    fields: Annotated[Fields, Depends(get_movie_fields)],
     user: Annotated[User | None, Depends(get_user)] = None
-) -> JSONResponse:
+) -> Response:
     """
     Get details of a movie from the movieDB service.
+    Fields can be selected with a preset (card or full) or comma separated fields.
     """
 
-    async with client:
-        try:
-            key = f"{movie_id}-detail"
-
-            data: dict | None = await cache.get(key)
-
-            is_added_in_watchlist = None
-            is_favorite = False
+    try:
+        async def fetch_movie_details() -> dict:
+            response = await client.get(endpoint=f"/movie/{movie_id}",
+                                        params={"append_to_response": "recommendations,videos,images"})
+            return response.json()
 
-            if user:
-                # Fetch the favorite movie status for current user
-                fav_key = f"{user.id}-{movie_id}"
-                is_favorite = await cache.get(fav_key)
+        entry = await get_or_set_projection(cache, cache_keys.MOVIE_DETAIL, fetch_movie_details, fields,
+                                            project_movie, movie_id=movie_id)
 
-                # Check if current user has already added the movie
-                # into his/her watchlist
-                is_added_in_watchlist = await is_watchlist_item_exists(session, user, movie_id)
+        is_added_in_watchlist = None
+        is_favorite = False
 
-            if not data:
-                response = await client.get(endpoint=f"/movie/{movie_id}",
-                                            params={"append_to_response": "recommendations,videos,images"})
-                data = response.json()
+        if user:
+            # Fetch the favorite movie status for current user
+            fav_key = cache_keys.FAVORITE.key(user_id=user.id, movie_id=movie_id)
+            is_favorite = await cache.get(fav_key)
 
-                # Save response in cache
-                await cache.set(key, data)
+            # Check if current user has already added the movie
+            # into his/her watchlist
+            is_added_in_watchlist = await is_watchlist_item_exists(session, user, movie_id)
 
-            # Append the local data into the response
-            data.update({
-                "is_added_in_watchlist": str(is_added_in_watchlist)
-                if isinstance(is_added_in_watchlist, uuid.UUID) else is_added_in_watchlist,
-                "is_favorite": bool(is_favorite)
-            })
+        # Append the local data into the cached response without parsing it
+        user_fields = {
+            "is_added_in_watchlist": str(is_added_in_watchlist)
+            if isinstance(is_added_in_watchlist, uuid.UUID) else is_added_in_watchlist,
+            "is_favorite": bool(is_favorite)
+        }
 
-            return JSONResponse(data, status_code=status.HTTP_200_OK)
+        return await cached_json_response(request, cache, entry, MOVIE_DETAIL_CACHE_CONTROL,
+                                          vary="Authorization", fields=user_fields)
 
-        except Exception as e:
-            raise HTTPException(detail=str(
-                e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
+    except Exception as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
 
 
 @router.get("/search/")
 async def search_movies(
+    request: Request,
     client: Annotated[CustomAsyncClient, Depends(get_client)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)],
     query: str,
+    fields: Annotated[Fields, Depends(get_listing_fields)],
     page: int = 1,
     user: Annotated[User | None, Depends(get_user)] = None
-) -> JSONResponse:
+) -> Response:
     """
     Search movies based on the given query.
     Query can be genre, keyword, movie title etc.
+    Fields of the movies can be selected with a preset (card or full) or comma separated fields.
     """
 
-    async with client:
-        try:
-            key = f"{query}-{page}-search"
-
-            data: dict | None = await cache.get(key)
-
-            if not data:
-                # Include mature or R-rated movies if user is authenticated
-                # And is at least 18 years old.
-                include_adult = user and user.age >= 18
+    try:
+        # Include mature or R-rated movies if user is authenticated
+        # And is at least 18 years old.
+        include_adult = bool(user and user.age >= 18)
 
-                response = await client.get(endpoint="/search/movie",
-                                            params={"query": query, "page": page, "include_adult": include_adult})
-                data = response.json()
+        async def search() -> dict:
+            response = await client.get(endpoint="/search/movie",
+                                        params={"query": query, "page": page, "include_adult": include_adult})
+            return response.json()
 
-                # Save response in DB
-                await cache.set(key, data)
+        entry = await get_or_set_projection(cache, cache_keys.SEARCH, search, fields, project_listing,
+                                            query=query, page=page, include_adult=include_adult,
+                                            variant=get_response_variant(request),
+                                            if_none_match=request.headers.get("if-none-match"))
 
-            return JSONResponse(data, status_code=status.HTTP_200_OK)
+        return await cached_json_response(request, cache, entry, MOVIES_CACHE_CONTROL, vary="Authorization")
 
-        except Exception as e:
-            raise HTTPException(detail=str(
-                e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
+    except Exception as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
 
 
 @router.post("/favorite/{movie_id}/")
@@ -230,17 +319,17 @@ async def mark_movie_favorite(
     user: Annotated[User, Depends(get_user)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)],
     movie_id: int
-) -> JSONResponse:
+) -> ORJSONResponse:
     """
     Mark the given movie as favorite for the current user.
     """
 
     try:
-        key = f"{user.id}-{movie_id}"
+        key = cache_keys.FAVORITE.key(user_id=user.id, movie_id=movie_id)
 
-        await cache.set(key, True)
+        await cache.set(key, True, expiry=cache_keys.FAVORITE.expiry)
 
-        return JSONResponse({
+        return ORJSONResponse({
             "message": strings.MOVIE_MARKED_FAVORITE_SUCCESSFULLY
         }, status_code=status.HTTP_201_CREATED)
 
@@ -254,17 +343,17 @@ async def remove_movie_favorite(
     user: Annotated[User, Depends(get_user)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)],
     movie_id: int
-) -> JSONResponse:
+) -> ORJSONResponse:
     """
     Remove the given movie as favorite for the current user.
     """
 
     try:
-        key = f"{user.id}-{movie_id}"
+        key = cache_keys.FAVORITE.key(user_id=user.id, movie_id=movie_id)
 
         await cache.delete(key)
 
-        return JSONResponse({
+        return ORJSONResponse({
             "message": strings.MOVIE_REMOVED_AS_FAVORITE_SUCCESSFULLY
         }, status_code=status.HTTP_200_OK)
 
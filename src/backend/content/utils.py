@@ -0,0 +1,213 @@
+import hashlib
+from typing import Any, Awaitable, Callable
+
+import orjson
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response
+
+import env
+import strings
+from cache import CacheEntry, CustomAsyncRedisClient, is_etag_matched
+from cache_keys import CacheKeyFamily
+from middlewares.compression import compress, get_accepted_encoding
+
+# Fields of a movie in the search and genre listings, And the named presets of them.
+# Full preset (None) keeps all the fields.
+LISTING_FIELDS = frozenset({
+    "adult", "backdrop_path", "genre_ids", "id", "original_language", "original_title", "overview",
+    "popularity", "poster_path", "release_date", "title", "video", "vote_average", "vote_count"
+})
+
+LISTING_FIELD_PRESETS: dict[str, tuple[str, ...] | None] = {
+    "card": ("genre_ids", "id", "poster_path", "release_date", "title", "vote_average"),
+    "full": None
+}
+
+# Fields of the movie details (including the ones appended to the response), And the named presets of them
+MOVIE_FIELDS = frozenset({
+    "adult", "backdrop_path", "belongs_to_collection", "budget", "genres", "homepage", "id", "imdb_id",
+    "origin_country", "original_language", "original_title", "overview", "popularity", "poster_path",
+    "production_companies", "production_countries", "release_date", "revenue", "runtime",
+    "spoken_languages", "status", "tagline", "title", "video", "vote_average", "vote_count",
+    "recommendations", "videos", "images"
+})
+
+MOVIE_FIELD_PRESETS: dict[str, tuple[str, ...] | None] = {
+    "card": ("backdrop_path", "genres", "id", "overview", "poster_path", "release_date", "runtime",
+             "tagline", "title", "vote_average", "vote_count"),
+    "full": None
+}
+
+# Name of the selected fields (a preset, or the sorted fields) along with the fields to keep,
+# None to keep all the fields.
+Fields = tuple[str, tuple[str, ...] | None]
+
+
+def splice_json_fields(raw: str | bytes, fields: dict[str, Any]) -> bytes:
+    """
+    Add the given fields in a serialized JSON object without parsing it,
+    i.e: To add per-user fields in a cached response which is shared by all users.
+    The fields should not already exist in the object.
+    """
+
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+
+    raw = raw.rstrip()
+    extra = orjson.dumps(fields)
+
+    if not raw.endswith(b"}"):
+        raise ValueError("Cached data is not a JSON object")
+
+    # An empty object doesn't need a separator
+    if raw[:-1].rstrip().endswith(b"{"):
+        return extra
+
+    return raw[:-1] + b"," + extra[1:]
+
+
+def get_response_variant(request: Request) -> str | None:
+    """
+    Get the variant of a cached entry which is sent for the given request,
+    i.e: Its content encoding. See cached_json_response.
+    """
+
+    return get_accepted_encoding(request.headers.get("accept-encoding", ""))
+
+
+async def cached_json_response(request: Request, cache: CustomAsyncRedisClient, entry: CacheEntry,
+                               cache_control: str, vary: str | None = None,
+                               fields: dict[str, Any] | None = None) -> Response:
+    """
+    Send a cached JSON entry as it is with its ETag, Or a 304 without the body
+    if the client already has it (as per If-None-Match).
+
+    Fields (if any) are added in the cached JSON object, i.e: Per-user data. Otherwise the body is
+    shared, So its compressed variant is stored along with the entry and reused by the next requests.
+    """
+
+    body, etag = entry.body, entry.etag
+
+    if fields:
+        extra = orjson.dumps(fields)
+        etag = f'{etag[:-1]}-{hashlib.blake2b(extra, digest_size=8).hexdigest()}"'
+
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if vary:
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+    # Entry is read without its body once the client has it, See get_or_set_entry
+    if body is None or is_etag_matched(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if fields:
+        body = splice_json_fields(body, fields)
+
+    # Responses with per-user fields are compressed by the compression middleware instead
+    encoding = get_response_variant(request)
+
+    if not fields and encoding and len(body) >= env.RESPONSE_COMPRESSION_MIN_SIZE:
+        if encoding not in entry.variants:
+            await cache.set_variant(entry, encoding, compress(body, encoding))
+
+        body = entry.variants[encoding]
+        headers["Content-Encoding"] = encoding
+
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def resolve_fields(fields: str | None, presets: dict[str, tuple[str, ...] | None],
+                   allowed: frozenset[str]) -> Fields:
+    """
+    Resolve the fields param, Which is either a preset name or comma separated fields,
+    Raise ValueError if any of the fields is unknown.
+    """
+
+    fields = (fields or "full").strip().lower()
+
+    if fields in presets:
+        return fields, presets[fields]
+
+    selected = tuple(sorted({field.strip() for field in fields.split(",") if field.strip()}))
+    unknown = set(selected) - allowed
+
+    if not selected or unknown:
+        raise ValueError(strings.INVALID_FIELDS.format(", ".join(sorted(unknown)) or fields))
+
+    return ",".join(selected), selected
+
+
+def get_listing_fields(fields: str | None = None) -> Fields:
+    """
+    Get fields to keep of each movie in a listing, From the fields param
+    """
+
+    try:
+        return resolve_fields(fields, LISTING_FIELD_PRESETS, LISTING_FIELDS)
+    except ValueError as e:
+        raise HTTPException(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST) from e
+
+
+def get_movie_fields(fields: str | None = None) -> Fields:
+    """
+    Get fields to keep of the movie details, From the fields param
+    """
+
+    try:
+        return resolve_fields(fields, MOVIE_FIELD_PRESETS, MOVIE_FIELDS)
+    except ValueError as e:
+        raise HTTPException(detail=str(e), status_code=status.HTTP_400_BAD_REQUEST) from e
+
+
+def project_movie(data: dict, fields: tuple[str, ...]) -> dict:
+    return {field: data[field] for field in fields if field in data}
+
+
+def project_listing(data: dict, fields: tuple[str, ...]) -> dict:
+    return {**data, "results": [project_movie(movie, fields) for movie in data.get("results", [])]}
+
+
+async def get_or_set_projection(cache: CustomAsyncRedisClient, family: CacheKeyFamily,
+                                fetch: Callable[[], Awaitable[Any]], fields: Fields,
+                                project: Callable[[Any, tuple[str, ...]], Any], variant: str | None = None,
+                                if_none_match: str | None = None, **vary: Any) -> CacheEntry:
+    """
+    Retrieve cached data of the given key family with only the selected fields,
+    On a miss load it using the given fetch function. Along with the given variant if it's stored,
+    Without the data if the client already has it (as per If-None-Match).
+
+    Full data is cached as the "full" variant, And each projection is cached as its own
+    variant which is derived from the full one. So the data is only trimmed (and serialized)
+    on a miss of the projection, Instead of on every request.
+
+    A projection is only fresh for as long as the full data it's derived from, So it doesn't
+    outlive a stale full variant (which is being refreshed) by another soft expiry.
+    """
+
+    name, selected = fields
+    full_key = family.key(fields="full", **vary)
+    soft_expiry = family.soft_expiry
+
+    # Remaining freshness of the full data which the projection is derived from
+    source_freshness: int | None = None
+
+    async def fetch_projection() -> Any:
+        nonlocal source_freshness
+
+        data = await cache.get_or_set(full_key, fetch, expiry=family.expiry,
+                                      soft_expiry=soft_expiry, local_expiry=family.local_expiry)
+
+        if soft_expiry is not None:
+            source_freshness = await cache.get_freshness(full_key)
+
+        return project(data, selected)
+
+    if selected is None:
+        key, fetch_variant, projection_soft_expiry = full_key, fetch, soft_expiry
+    else:
+        key, fetch_variant = family.key(fields=name, **vary), fetch_projection
+        projection_soft_expiry = None if soft_expiry is None else (lambda _: source_freshness)
+
+    return await cache.get_or_set_entry(key, fetch_variant, expiry=family.expiry,
+                                        soft_expiry=projection_soft_expiry, local_expiry=family.local_expiry,
+                                        variant=variant, if_none_match=if_none_match)
@@ -1,15 +1,220 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
-from sqlalchemy.orm import DeclarativeBase
+import asyncio
+import logging
+import random
+import time
+
+from sqlalchemy import event, exc, make_url, text, Select, Engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs, AsyncEngine
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 import env
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def get_db_url(host: str | None, port: str | None) -> str:
+    return f"postgresql+asyncpg://{env.DB_USER}:{env.DB_PASSWORD}@{host}:{port}/{env.DB_NAME}"
+
+
+DB_URL = get_db_url(env.DB_HOST, env.DB_PORT)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool which records how long callers wait to check out a connection,
+    And how many give up since the pool is exhausted.
+    """
+
+    def connect(self):
+        start_time = time.perf_counter()
+
+        try:
+            return super().connect()
+
+        except exc.TimeoutError:
+            metrics.DB_POOL_TIMEOUTS.inc()
+            raise
+
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start_time)
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Create an async engine with the pool and statement settings from env
+    """
+
+    # SQLAlchemy prepared statements cache (DB URL option) and asyncpg's own cache (connect arg),
+    # Both need to be disabled (set to 0) behind pgbouncer in transaction mode.
+    _engine = create_async_engine(
+        make_url(url).update_query_dict({
+            "prepared_statement_cache_size": str(env.DB_STATEMENT_CACHE_SIZE)
+        }),
+        echo=env.DB_ECHO,
+        future=True,
+        poolclass=InstrumentedPool,
+        pool_size=env.DB_POOL_SIZE,
+        max_overflow=env.DB_MAX_OVERFLOW,
+        pool_timeout=env.DB_POOL_TIMEOUT,
+        pool_recycle=env.DB_POOL_RECYCLE,
+        pool_pre_ping=env.DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": env.DB_STATEMENT_CACHE_SIZE}
+    )
 
+    track_queries(_engine.sync_engine)
+    return _engine
 
-DB_URL = f"postgresql+asyncpg://{env.DB_USER}:{
-    env.DB_PASSWORD}@{env.DB_HOST}:{env.DB_PORT}/{env.DB_NAME}"
 
-engine = create_async_engine(DB_URL, echo=True, future=True)
-SessionLocal = async_sessionmaker(expire_on_commit=False, bind=engine)
+class RoutingSession(Session):
+    """
+    Session which sends the reads marked with the "use_replica" execution option
+    (i.e: select(...).execution_options(use_replica=True)) to a healthy replica,
+    And everything else (i.e: writes, flushes) to the primary.
+
+    Replicas are skipped when the session is marked as sticky (session.info["use_replica"] is False),
+    i.e: right after the user has written something, So that they can read their own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> Engine:
+        if self._flushing or not isinstance(clause, Select):
+            self.info["has_writes"] = True
+            return engine.sync_engine
+
+        if not clause.get_execution_options().get("use_replica") or not self.info.get("use_replica", True):
+            return engine.sync_engine
+
+        # Stick to the same replica for the whole session, While it's healthy
+        replica = self.info.get("replica")
+
+        if replica not in healthy_replicas:
+            if not healthy_replicas:
+                return engine.sync_engine
+
+            replica = self.info["replica"] = random.choice(healthy_replicas)
+
+        return replica.sync_engine
 
 
 class Base(AsyncAttrs, DeclarativeBase):
     pass
+
+
+def get_pool_stats(_engine: AsyncEngine) -> dict[str, int]:
+    """
+    Get usage of the DB connection pool of a given engine,
+    i.e: Checked out, idle connections and connections opened beyond the pool size.
+    """
+
+    pool = _engine.sync_engine.pool
+
+    return {
+        "active": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0)
+    }
+
+
+def get_query_name(context, statement: str | None) -> str:
+    """
+    Get name of the query to label metrics with, Queries are named using
+    the "query_name" execution option, i.e: select(...).execution_options(query_name="...").
+    Unnamed ones (i.e: ORM flushes) are labelled by their statement type.
+    """
+
+    query_name = context.execution_options.get("query_name") if context else None
+    if query_name:
+        return query_name
+
+    statement_type = statement.split(None, 1)[0].lower() if statement and statement.strip() else "statement"
+    return f"unnamed_{statement_type}"
+
+
+def before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, _cursor, statement, _parameters, context, _executemany):
+    start_time = conn.info["query_start_time"].pop()
+    metrics.DB_QUERY_DURATION.labels(query=get_query_name(context, statement)).observe(
+        time.perf_counter() - start_time
+    )
+
+
+def handle_error(exception_context):
+    # Drop the start time of the failed statement
+    start_times = exception_context.connection.info.get("query_start_time") \
+        if exception_context.connection else None
+    if start_times:
+        start_times.pop()
+
+    metrics.DB_QUERY_ERRORS.labels(query=get_query_name(exception_context.execution_context,
+                                                        exception_context.statement)).inc()
+
+
+def track_queries(sync_engine: Engine) -> None:
+    """
+    Record duration and failure of the SQL statements run on a given engine
+    """
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+
+
+def set_statement_timeout(_session, _transaction, connection) -> None:
+    """
+    Set the statement timeout for each transaction of a session (on each of its connections),
+    Settings of the connection itself don't hold behind pgbouncer in transaction mode since
+    its server connections are shared, And the startup parameters are rejected by pgbouncer.
+    """
+
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {env.DB_STATEMENT_TIMEOUT}",
+                               execution_options={"query_name": "set_statement_timeout"})
+
+
+engine = create_engine(DB_URL)
+
+# Optional read replicas, Which are taken out of rotation while they're failing the health checks
+replica_engines = [create_engine(get_db_url(host, port or env.DB_PORT))
+                   for host, _, port in (replica.strip().partition(":")
+                                         for replica in env.DB_REPLICA_HOSTS.split(",") if replica.strip())]
+healthy_replicas: list[AsyncEngine] = list(replica_engines)
+
+SessionLocal = async_sessionmaker(expire_on_commit=False, bind=engine, sync_session_class=RoutingSession)
+
+if env.DB_STATEMENT_TIMEOUT:
+    event.listen(RoutingSession, "after_begin", set_statement_timeout)
+
+
+async def check_replicas_health(interval: float) -> None:
+    """
+    Keep checking if the replicas are reachable, Till the task is cancelled.
+    Reads fall back to the primary when none of them is healthy.
+    """
+
+    while True:
+        for index, replica in enumerate(replica_engines):
+            try:
+                async with asyncio.timeout(env.DB_REPLICA_HEALTH_CHECK_TIMEOUT):
+                    async with replica.connect() as connection:
+                        await connection.execute(text("SELECT 1"))
+
+                is_healthy = True
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception:
+                logger.exception("DB replica %s failed the health check", index)
+                is_healthy = False
+
+            if is_healthy and replica not in healthy_replicas:
+                healthy_replicas.append(replica)
+            elif not is_healthy and replica in healthy_replicas:
+                healthy_replicas.remove(replica)
+
+            metrics.DB_REPLICA_HEALTHY.labels(replica=str(index)).set(int(is_healthy))
+
+        await asyncio.sleep(interval)
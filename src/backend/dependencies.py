@@ -2,18 +2,28 @@
 Centralize place to put functions which will serve as dependency in all API routes.
 """
 
-from fastapi import Request, HTTPException, status
+import logging
+from typing import Annotated
 
-import env
+from fastapi import Request, HTTPException, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import cache_keys
 import strings
-from database import SessionLocal
+from database import SessionLocal, replica_engines
 from cache import CustomAsyncRedisClient
 from user.models import User
-from user.queries import get_user_by_id
+from user.queries import get_cached_user_by_id
 from user.utils import get_jwt_payload
 
+logger = logging.getLogger(__name__)
+
+
+def get_sticky_key(user_id: str) -> str:
+    return cache_keys.STICKY.key(user_id=user_id)
 
-async def get_async_db_session():
+
+async def get_async_db_session(request: Request):
     """
     Yield async db session instance
     """
@@ -25,12 +35,41 @@ async def get_async_db_session():
         await session.rollback()
         raise
     finally:
-        await session.close()
+        # Keep reads of the user on the primary for a while after they write something,
+        # So they can read their own writes before those reach the replicas.
+        user_id = session.info.get("user_id")
+
+        try:
+            if replica_engines and user_id and session.info.get("has_writes"):
+                await request.app.state.cache.set(get_sticky_key(user_id), True,
+                                                  expiry=cache_keys.STICKY.expiry)
+
+        except Exception:
+            # The write is already done, Only the read-your-writes guarantee is lost
+            logger.exception("Could not mark user %s as sticky to the primary DB", user_id)
+
+        finally:
+            await session.close()
+
+
+async def get_cache_client(request: Request) -> CustomAsyncRedisClient:
+    """
+    Get the app-wide async redis cache client
+    """
+
+    return request.app.state.cache
 
 
-async def get_user(request: Request) -> User | None:
+async def get_user(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_async_db_session)],
+    cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)]
+) -> User | None:
     """
     Retrieve user object from auth token.
+
+    User profile is served from cache when possible, Otherwise it's fetched with a DB session
+    of its own (routed as the request session), See get_cached_user_by_id.
     """
 
     is_error = True
@@ -46,9 +85,14 @@ async def get_user(request: Request) -> User | None:
             user_id: str | None = payload.get("user_id")
 
             if user_id:
-                # Fetch user object from DB using the ID.
-                session = await get_async_db_session().asend(None)
-                user = await get_user_by_id(session, user_id)
+                session.info["user_id"] = user_id
+
+                # Read from the primary if the user has written something recently
+                if replica_engines:
+                    session.info["use_replica"] = not await cache.get(get_sticky_key(user_id))
+
+                # Fetch user object from cache or DB using the ID.
+                user = await get_cached_user_by_id(session, cache, user_id)
 
                 if user:
                     is_error = False
@@ -66,22 +110,3 @@ async def get_user(request: Request) -> User | None:
 
     return user
 
-
-async def get_cache_client():
-    """
-    Get async redis cache client
-    """
-
-    host = env.REDIS_HOST
-    port = env.REDIS_PORT
-
-    if not host or not port:
-        raise KeyError("Cache credentials are not configured in env")
-
-    try:
-        cache = CustomAsyncRedisClient(host=host, port=int(port))
-        await cache.connect()
-        yield cache
-    except Exception:
-        await cache.close()
-        raise
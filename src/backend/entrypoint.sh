@@ -15,8 +15,16 @@ while true; do
     # If command succeeded, exit
     if [ $EXIT_CODE -eq 0 ]; then
         echo "DB Migrations Applied successfully!"
-        fastapi run --proxy-headers  # Run app server
-        exit 0
+
+        # Run app server, Migrations are applied once above before the workers are started
+        if [ "$APP_SERVER" = "gunicorn" ]; then
+            # Workers write their metrics here so /metrics can aggregate them, It has to be
+            # set before gunicorn starts since prometheus_client reads it when it's imported
+            export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus_multiproc}"
+            exec gunicorn -c gunicorn.conf.py main:app
+        fi
+
+        exec fastapi run --proxy-headers
     fi
 
     # Check if we've exceeded timeout
@@ -10,6 +10,28 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 
+# DB engine settings, The pool is per worker process so the total number of connections
+# is (pool size + max overflow) * workers, Which should fit in the pgbouncer pool.
+# Statement cache size should be 0 behind pgbouncer in transaction mode,
+# And statement timeout (in milliseconds) is set with SET LOCAL on every transaction of the sessions,
+# It costs a round trip per transaction so it can be disabled (0) once it's set on the DB role instead
+# (ALTER ROLE ... SET statement_timeout = ...).
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", "15000"))
+
+# Optional read replicas as comma separated "host:port", Along with how often (in seconds) their
+# health is checked and how long (in seconds) a user's reads stick to the primary after a write
+DB_REPLICA_HOSTS = os.getenv("DB_REPLICA_HOSTS", "")
+DB_REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+DB_REPLICA_HEALTH_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_HEALTH_CHECK_TIMEOUT", "2"))
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = os.getenv("REDIS_PORT")
 
@@ -18,3 +40,98 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 
 MOVIE_DB_BASE_URL = os.getenv("MOVIE_DB_BASE_URL")
 MOVIE_DB_ACCESS_TOKEN = os.getenv("MOVIE_DB_ACCESS_TOKEN")
+
+# MovieDB API client connection pool settings
+MOVIE_DB_MAX_CONNECTIONS = int(os.getenv("MOVIE_DB_MAX_CONNECTIONS", "100"))
+MOVIE_DB_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MOVIE_DB_MAX_KEEPALIVE_CONNECTIONS", "20"))
+MOVIE_DB_KEEPALIVE_EXPIRY = float(os.getenv("MOVIE_DB_KEEPALIVE_EXPIRY", "30"))
+MOVIE_DB_TIMEOUT = float(os.getenv("MOVIE_DB_TIMEOUT", "10"))
+MOVIE_DB_CONNECT_TIMEOUT = float(os.getenv("MOVIE_DB_CONNECT_TIMEOUT", "5"))
+MOVIE_DB_POOL_TIMEOUT = float(os.getenv("MOVIE_DB_POOL_TIMEOUT", "5"))
+MOVIE_DB_HTTP2 = os.getenv("MOVIE_DB_HTTP2", "false").lower() == "true"
+
+# Max size (in bytes) of a MovieDB response which is parsed while it's streamed
+MOVIE_DB_MAX_RESPONSE_BYTES = int(os.getenv("MOVIE_DB_MAX_RESPONSE_BYTES", str(5 * 1024 * 1024)))
+
+# Redis connection pool settings
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "5"))
+
+# Featured movies settings, Timeout (in seconds) for fetching each section
+# And cache expiry (in seconds) of a response which is missing some sections
+FEATURED_SECTION_TIMEOUT = float(os.getenv("FEATURED_SECTION_TIMEOUT", "3"))
+FEATURED_PARTIAL_CACHE_EXPIRY = int(os.getenv("FEATURED_PARTIAL_CACHE_EXPIRY", "60"))
+
+# Time (in seconds) after which a lock held for filling a cache key expires
+REDIS_LOCK_TIMEOUT = float(os.getenv("REDIS_LOCK_TIMEOUT", "10"))
+
+# In-process memory cache settings, Which is kept in front of redis for hot shared keys
+CACHE_LOCAL_ENABLED = os.getenv("CACHE_LOCAL_ENABLED", "true").lower() == "true"
+CACHE_LOCAL_MAX_ITEMS = int(os.getenv("CACHE_LOCAL_MAX_ITEMS", "1000"))
+CACHE_LOCAL_MAX_BYTES = int(os.getenv("CACHE_LOCAL_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Max number of movie details fetched concurrently from MovieDB,
+# While filling the missing watchlist entries in cache
+WATCHLIST_BACKFILL_CONCURRENCY = int(os.getenv("WATCHLIST_BACKFILL_CONCURRENCY", "5"))
+
+# Job queue settings, Workers run inside the app unless disabled
+# (then run them as a separate process with: python worker.py)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_WORKERS_IN_APP = os.getenv("JOB_WORKERS_IN_APP", "true").lower() == "true"
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2"))
+JOB_DEDUPE_EXPIRY = int(os.getenv("JOB_DEDUPE_EXPIRY", "3600"))
+
+# Seconds after which a job worker which missed its heartbeats is considered dead, And its
+# unfinished jobs are put back in the queue. It should be longer than the longest job.
+JOB_WORKER_TIMEOUT = int(os.getenv("JOB_WORKER_TIMEOUT", "300"))
+
+# Port on which a separate job worker process (worker.py) exposes its metrics
+JOB_WORKER_METRICS_PORT = int(os.getenv("JOB_WORKER_METRICS_PORT", "9100"))
+
+# Expiry (in seconds) of the authenticated user profile in redis and in memory,
+# Which is its only invalidation since the profiles are never updated or deleted
+USER_CACHE_EXPIRY = int(os.getenv("USER_CACHE_EXPIRY", "300"))
+USER_LOCAL_CACHE_EXPIRY = int(os.getenv("USER_LOCAL_CACHE_EXPIRY", "30"))
+
+# Password hashing pool, Number of threads and calls allowed to wait for a thread
+# before new ones are rejected with 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+# Request logging settings, Share of successful requests to log (errors are always logged),
+# Request/response headers to include and max size (in bytes) of the logged request body (0 to disable)
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1"))
+LOG_HEADERS = os.getenv("LOG_HEADERS", "user-agent,content-type,content-length,referer")
+LOG_BODY_MAX_BYTES = int(os.getenv("LOG_BODY_MAX_BYTES", "0"))
+
+# Buckets (in seconds) of the HTTP request duration histogram, Aligned with the latency SLOs
+HTTP_LATENCY_BUCKETS = os.getenv("HTTP_LATENCY_BUCKETS", "0.025,0.05,0.1,0.2,0.3,0.5,0.75,1,2,5")
+
+# Interval (in seconds) for refreshing the connection pool and memory cache gauges
+METRICS_SAMPLE_INTERVAL = float(os.getenv("METRICS_SAMPLE_INTERVAL", "5"))
+
+# Format (json or msgpack) and compression (none, zlib or zstd) of the data stored in redis,
+# Data larger than the threshold (in bytes) gets compressed. Responses which are sent
+# as they're cached are always stored as JSON, But they're compressed as well.
+# So msgpack only applies to the values written with set and set_many (i.e: watchlist movie details
+# and the favorite and sticky flags), See codec.py for the numbers.
+CACHE_FORMAT = os.getenv("CACHE_FORMAT", "json")
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zstd")
+CACHE_COMPRESSION_THRESHOLD = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", "4096"))
+CACHE_COMPRESSION_LEVEL = int(os.getenv("CACHE_COMPRESSION_LEVEL", "3"))
+
+# Cache keys settings, Namespace prefixed to all the keys, Per family version overrides
+# (i.e: "detail=2,search=3") to drop a family at once, And ratio by which expiry is randomly spread
+CACHE_NAMESPACE = os.getenv("CACHE_NAMESPACE", "watcher")
+CACHE_KEY_VERSIONS = os.getenv("CACHE_KEY_VERSIONS", "")
+CACHE_EXPIRY_JITTER = float(os.getenv("CACHE_EXPIRY_JITTER", "0.1"))
+
+# Response compression settings, Min size (in bytes) of the responses to compress
+# And compression level of gzip (1-9) and brotli (0-11)
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
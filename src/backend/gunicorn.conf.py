@@ -0,0 +1,57 @@
+"""
+Gunicorn config for running the app with multiple uvicorn workers in production,
+i.e: gunicorn -c gunicorn.conf.py main:app
+
+Send SIGHUP to the master process to gracefully reload the workers (i.e: after a config change)
+and SIGTERM to gracefully shut them down.
+"""
+
+import os
+import shutil
+
+# Workers write their metrics in PROMETHEUS_MULTIPROC_DIR, So /metrics can aggregate them.
+# It's set by entrypoint.sh, Since it has to be in the env before prometheus_client is
+# first imported (by the master or a worker), Which is when its value class is chosen.
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Restart a worker if it's silent for this long, And give the in-flight requests
+# this long to finish on reload/shutdown
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WORKER_KEEPALIVE", "5"))
+
+# Trust the proxy headers, Same as --proxy-headers
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "*")
+
+accesslog = None
+errorlog = "-"
+
+
+def on_starting(_server):
+    """
+    Clear the metrics left by the previous run
+    """
+
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not multiproc_dir:
+        return
+
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(_server, worker):
+    """
+    Drop the live gauges of a worker which has exited
+    """
+
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return
+
+    # Imported here so that prometheus_client is never imported before the env is set
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
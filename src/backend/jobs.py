@@ -0,0 +1,277 @@
+"""
+A small redis backed job queue, To move slow work (like calls to the MovieDB service)
+off the request path. Workers can run inside the app or as a separate process (worker.py).
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+import env
+import metrics
+from cache import CustomAsyncRedisClient
+from content.api_client import CustomAsyncClient
+
+logger = logging.getLogger(__name__)
+
+# All the keys of the queue share the "{jobs}" hash tag, So the scripts which touch several
+# of them (all passed in KEYS) run on a single slot of a redis cluster or behind a proxy.
+
+# Jobs which are ready to be picked by a worker
+READY_QUEUE = "{jobs}-ready"
+
+# Jobs which are waiting for their retry, Scored by the time they should run at
+SCHEDULED_QUEUE = "{jobs}-scheduled"
+
+# Jobs which are being run by a worker, A list per worker. A job stays there till it's done,
+# So the jobs of a worker which died (or was stopped) midway can be put back in the ready queue.
+PROCESSING_QUEUE = "{{jobs}}-processing-{}"
+
+# Workers which are alive, Scored by the time of their last heartbeat
+WORKERS = "{jobs}-workers"
+
+# Push a job only if there isn't an identical job which is still pending
+ENQUEUE_SCRIPT = """
+if redis.call("set", KEYS[1], 1, "NX", "EX", ARGV[2]) then
+    redis.call("lpush", KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Move the scheduled jobs whose retry time has come to the ready queue
+PROMOTE_SCRIPT = """
+local jobs = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1], "LIMIT", 0, ARGV[2])
+for _, job in ipairs(jobs) do
+    redis.call("zrem", KEYS[1], job)
+    redis.call("lpush", KEYS[2], job)
+end
+return #jobs
+"""
+
+# Put the unfinished jobs of a worker back in the ready queue, And unregister the worker
+RELEASE_SCRIPT = """
+local count = 0
+while redis.call("lmove", KEYS[1], KEYS[2], "RIGHT", "RIGHT") do
+    count = count + 1
+end
+redis.call("zrem", KEYS[3], ARGV[1])
+return count
+"""
+
+# Job handlers mapped by job name, A handler receives the API client
+# and cache client along with the job arguments.
+Handler = Callable[..., Awaitable[None]]
+JOB_HANDLERS: dict[str, Handler] = {}
+
+
+def job(name: str) -> Callable[[Handler], Handler]:
+    """
+    Register the decorated function as the handler of the given job name
+    """
+
+    def decorator(handler: Handler) -> Handler:
+        JOB_HANDLERS[name] = handler
+        return handler
+
+    return decorator
+
+
+def get_dedupe_key(name: str, dedupe_key: str | None) -> str:
+    return f"{{jobs}}-job-{name}-{dedupe_key or uuid.uuid4().hex}"
+
+
+async def enqueue(cache: CustomAsyncRedisClient, name: str, kwargs: dict[str, Any],
+                  dedupe_key: str | None = None) -> bool:
+    """
+    Add a job in the queue, Jobs with the same name and dedupe key
+    are only added once till the pending one is done.
+    Return whether the job was added.
+    """
+
+    return await enqueue_many(cache, name, [(kwargs, dedupe_key)]) == 1
+
+
+async def enqueue_many(cache: CustomAsyncRedisClient, name: str,
+                       jobs: list[tuple[dict[str, Any], str | None]]) -> int:
+    """
+    Add jobs of the same name in the queue in a single round trip,
+    Return number of jobs which were added.
+    """
+
+    if not jobs:
+        return 0
+
+    script = cache.get_script(ENQUEUE_SCRIPT)
+
+    async with cache.client.pipeline(transaction=False) as pipe:
+        for kwargs, dedupe_key in jobs:
+            dedupe_key = get_dedupe_key(name, dedupe_key)
+
+            payload = json.dumps({
+                "name": name,
+                "kwargs": kwargs,
+                "dedupe_key": dedupe_key,
+                "attempts": 0,
+                "enqueued_at": time.time()
+            })
+
+            await script(keys=[dedupe_key, READY_QUEUE],
+                         args=[payload, env.JOB_DEDUPE_EXPIRY], client=pipe)
+
+        results = await pipe.execute()
+
+    return sum(results)
+
+
+async def run_worker(client: CustomAsyncClient, cache: CustomAsyncRedisClient) -> None:
+    """
+    Keep picking jobs from the queue and run them, Till the worker is cancelled.
+
+    A picked job is moved to the processing list of the worker till it's done. If the worker
+    is stopped midway the job is put back in the ready queue, And if the worker dies its jobs
+    are put back by the other workers once its heartbeat expires.
+    """
+
+    worker_id = uuid.uuid4().hex
+    processing_queue = PROCESSING_QUEUE.format(worker_id)
+
+    promote_jobs = cache.get_script(PROMOTE_SCRIPT)
+
+    try:
+        while True:
+            try:
+                now = time.time()
+                await cache.client.zadd(WORKERS, {worker_id: now})
+
+                await promote_jobs(keys=[SCHEDULED_QUEUE, READY_QUEUE], args=[now, 100])
+                await recover_workers(cache, now - env.JOB_WORKER_TIMEOUT)
+                await record_queue_depth(cache)
+
+                item = await cache.client.blmove(READY_QUEUE, processing_queue, 1, "RIGHT", "LEFT")
+                if not item:
+                    continue
+
+                try:
+                    await run_job(client, cache, json.loads(item))
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("Job worker failed to run a job")
+
+                # The job is done (or scheduled for a retry)
+                await cache.client.lrem(processing_queue, 1, item)
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception:
+                logger.exception("Job worker failed to pick a job")
+                await asyncio.sleep(1)
+
+    finally:
+        # Put the job which was interrupted back in the ready queue, To be picked by another worker
+        await release_worker(cache, worker_id)
+
+
+async def recover_workers(cache: CustomAsyncRedisClient, heartbeat_before: float) -> None:
+    """
+    Put the jobs of the workers which missed their heartbeats back in the ready queue,
+    Each worker is released by its own script call, Since its processing list is a key of its own.
+    """
+
+    for worker_id in await cache.client.zrangebyscore(WORKERS, "-inf", heartbeat_before):
+        await release_worker(cache, worker_id.decode())
+
+
+async def release_worker(cache: CustomAsyncRedisClient, worker_id: str) -> None:
+    """
+    Put the unfinished jobs of the given worker back in the ready queue, And unregister the worker
+    """
+
+    try:
+        await cache.get_script(RELEASE_SCRIPT)(keys=[PROCESSING_QUEUE.format(worker_id), READY_QUEUE, WORKERS],
+                                               args=[worker_id])
+    except Exception:
+        logger.exception("Failed to release the jobs of worker %s", worker_id)
+
+
+async def run_job(client: CustomAsyncClient, cache: CustomAsyncRedisClient, payload: dict[str, Any]) -> None:
+    """
+    Run the given job, On failure schedule a retry with exponential backoff
+    till the max attempts are exhausted.
+    """
+
+    name = payload["name"]
+    handler = JOB_HANDLERS.get(name)
+
+    # Time the job waited in the queue, Since it was added or scheduled for retry
+    metrics.JOB_LAG.labels(name=name).observe(
+        max(time.time() - payload.get("run_at", payload["enqueued_at"]), 0)
+    )
+
+    start_time = time.perf_counter()
+
+    try:
+        if not handler:
+            raise KeyError(f"No handler is registered for job: {name}")
+
+        await handler(client, cache, **payload["kwargs"])
+
+    except Exception:
+        payload["attempts"] += 1
+
+        if handler and payload["attempts"] < env.JOB_MAX_ATTEMPTS:
+            payload["run_at"] = time.time() + env.JOB_RETRY_BACKOFF * 2 ** (payload["attempts"] - 1)
+            await cache.client.zadd(SCHEDULED_QUEUE, {json.dumps(payload): payload["run_at"]})
+
+            metrics.JOBS_PROCESSED.labels(name=name, status="retried").inc()
+            return
+
+        logger.exception("Job %s failed after %s attempts", name, payload["attempts"])
+        metrics.JOBS_PROCESSED.labels(name=name, status="failed").inc()
+
+    else:
+        metrics.JOBS_PROCESSED.labels(name=name, status="succeeded").inc()
+
+    finally:
+        metrics.JOB_DURATION.labels(name=name).observe(time.perf_counter() - start_time)
+
+    # Allow the same job to be added again
+    await cache.client.delete(payload["dedupe_key"])
+
+
+async def record_queue_depth(cache: CustomAsyncRedisClient) -> None:
+    """
+    Export number of the ready and scheduled jobs on prometheus
+    """
+
+    async with cache.client.pipeline(transaction=False) as pipe:
+        pipe.llen(READY_QUEUE)
+        pipe.zcard(SCHEDULED_QUEUE)
+        ready, scheduled = await pipe.execute()
+
+    metrics.JOB_QUEUE_DEPTH.labels(queue="ready").set(ready)
+    metrics.JOB_QUEUE_DEPTH.labels(queue="scheduled").set(scheduled)
+
+
+def start_workers(client: CustomAsyncClient, cache: CustomAsyncRedisClient, count: int) -> list[asyncio.Task]:
+    """
+    Start the given number of workers in the background
+    """
+
+    return [asyncio.create_task(run_worker(client, cache)) for _ in range(count)]
+
+
+async def stop_workers(workers: list[asyncio.Task]) -> None:
+    """
+    Cancel the given workers and wait for them to stop
+    """
+
+    for worker in workers:
+        worker.cancel()
+
+    await asyncio.gather(*workers, return_exceptions=True)
@@ -1,17 +1,92 @@
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
 from prometheus_client import make_asgi_app
 
-from middlewares.logger import LoggingMiddleware
+import database
+import env
+import jobs
+import metrics
+from cache import create_cache_client
+from middlewares.compression import CompressionMiddleware
+from middlewares.logger import LoggingMiddleware, log_listener
 from middlewares.prometheus import PrometheusMiddleware
 from user.routes import router as u_router
+from user.utils import password_hash_executor
 from watchlist.routes import router as w_router
 from content.routes import router as c_router
+from content.api_client import create_client
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Create app-wide resources on startup and release them on shutdown.
+    """
+
+    # Background thread which formats and writes the logs
+    log_listener.start()
+
+    # Long-lived MovieDB API client, So connections are reused across requests
+    _app.state.api_client = create_client()
+    metrics.track_pool("moviedb", _app.state.api_client.get_pool_stats)
+
+    # DB connection pool usage
+    metrics.track_pool("postgres", partial(database.get_pool_stats, database.engine))
+
+    # Keep track of the read replicas health, Reads are routed only to the healthy ones
+    _app.state.replicas_health_check = None
+    if database.replica_engines:
+        for index, replica in enumerate(database.replica_engines):
+            metrics.track_pool(f"postgres-replica-{index}", partial(database.get_pool_stats, replica))
+
+        _app.state.replicas_health_check = asyncio.create_task(
+            database.check_replicas_health(env.DB_REPLICA_HEALTH_CHECK_INTERVAL)
+        )
+
+    # Redis client backed by a single shared connection pool
+    _app.state.cache = await create_cache_client()
+    metrics.track_pool("redis", _app.state.cache.get_pool_stats)
+
+    # Keep memory caches of all the workers in sync
+    if _app.state.cache.local_cache:
+        _app.state.cache.start_invalidation_listener()
+        metrics.track_memory_cache(_app.state.cache.local_cache.get_stats)
+
+    # Refresh the in-process resource gauges
+    _app.state.metrics_sampler = asyncio.create_task(metrics.run_samplers(env.METRICS_SAMPLE_INTERVAL))
+
+    # Workers for the background jobs
+    _app.state.job_workers = []
+    if env.JOB_WORKERS_IN_APP:
+        _app.state.job_workers = jobs.start_workers(_app.state.api_client, _app.state.cache,
+                                                    env.JOB_WORKERS)
+
+    yield
+
+    await jobs.stop_workers(_app.state.job_workers)
+
+    _app.state.metrics_sampler.cancel()
+
+    if _app.state.replicas_health_check:
+        _app.state.replicas_health_check.cancel()
+    metrics.SAMPLERS.clear()
+
+    await _app.state.api_client.aclose()
+    await _app.state.cache.close()
+
+    password_hash_executor.shutdown(wait=False, cancel_futures=True)
+
+    # Flush the pending logs
+    log_listener.stop()
 
 
 def get_app() -> FastAPI:
-    _app = FastAPI()
+    _app = FastAPI(lifespan=lifespan)
 
     # Add CORS Middlewares
     _app.add_middleware(
@@ -29,7 +104,7 @@ def get_app() -> FastAPI:
     _app.include_router(c_router, prefix="/api/content")
 
     # Add prometheus ASGI app to route /metrics requests
-    metrics_app = make_asgi_app()
+    metrics_app = make_asgi_app(metrics.get_registry())
     _app.mount("/metrics/", metrics_app)
 
     return _app
@@ -39,8 +114,9 @@ app = get_app()
 add_pagination(app)
 
 # Add custom middlewares
-app.middleware("http")(LoggingMiddleware())
-app.middleware("http")(PrometheusMiddleware())
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(LoggingMiddleware)
+app.add_middleware(PrometheusMiddleware)
 
 
 @app.get("/health-check/", status_code=status.HTTP_200_OK)
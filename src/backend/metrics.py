@@ -0,0 +1,216 @@
+"""
+Centralize place to define prometheus metrics which will be recorded across the project.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Callable
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.multiprocess import MultiProcessCollector
+
+import env
+
+logger = logging.getLogger(__name__)
+
+# Requests are labelled by the matched route template (i.e: /api/content/detail/{movie_id}/)
+# Instead of the actual path, So number of time series doesn't grow with number of movies/items.
+HTTP_REQUESTS = Counter(
+    name="http_requests_total",
+    documentation="Total number of HTTP requests.",
+    labelnames=["method", "path"]
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    name="http_request_duration_seconds",
+    documentation="HTTP request duration in seconds.",
+    labelnames=["method", "path", "status"],
+    buckets=[float(bucket) for bucket in env.HTTP_LATENCY_BUCKETS.split(",")]
+)
+
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    name="http_requests_in_progress",
+    documentation="Number of HTTP requests being processed.",
+    labelnames=["method"],
+    multiprocess_mode="livesum"
+)
+
+CONNECTION_POOL_CONNECTIONS = Gauge(
+    name="connection_pool_connections",
+    documentation="Number of connections in an app-wide connection pool, by state.",
+    labelnames=["pool", "state"],
+    multiprocess_mode="livesum"
+)
+
+CACHE_REQUESTS = Counter(
+    name="cache_requests_total",
+    documentation="Total number of cache lookups, by cache tier, key family and result.",
+    labelnames=["tier", "family", "result"]
+)
+
+# Outbound dependencies, To tell which one is slowing down a request
+MOVIE_DB_REQUESTS = Counter(
+    name="moviedb_requests_total",
+    documentation="Total number of requests to the MovieDB service, by endpoint template and status.",
+    labelnames=["endpoint", "status"]
+)
+
+MOVIE_DB_REQUEST_DURATION = Histogram(
+    name="moviedb_request_duration_seconds",
+    documentation="MovieDB request duration in seconds, by endpoint template and status.",
+    labelnames=["endpoint", "status"]
+)
+
+REDIS_COMMAND_DURATION = Histogram(
+    name="redis_command_duration_seconds",
+    documentation="Redis command duration in seconds, by cache operation and key family.",
+    labelnames=["operation", "family"],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1]
+)
+
+REDIS_COMMAND_ERRORS = Counter(
+    name="redis_command_errors_total",
+    documentation="Total number of failed redis commands, by cache operation and key family.",
+    labelnames=["operation", "family"]
+)
+
+DB_QUERY_DURATION = Histogram(
+    name="db_query_duration_seconds",
+    documentation="SQL statement execution duration in seconds, by query name.",
+    labelnames=["query"],
+    buckets=[0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5]
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    name="db_pool_checkout_wait_seconds",
+    documentation="Time taken to check out a connection from the DB connection pool, in seconds.",
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+)
+
+DB_POOL_TIMEOUTS = Counter(
+    name="db_pool_timeouts_total",
+    documentation="Total number of DB connection checkouts which timed out since the pool was exhausted."
+)
+
+DB_REPLICA_HEALTHY = Gauge(
+    name="db_replica_healthy",
+    documentation="Whether a DB read replica is passing the health checks (1) or not (0).",
+    labelnames=["replica"],
+    multiprocess_mode="livemin"
+)
+
+DB_QUERY_ERRORS = Counter(
+    name="db_query_errors_total",
+    documentation="Total number of failed SQL statements, by query name.",
+    labelnames=["query"]
+)
+
+MEMORY_CACHE_USAGE = Gauge(
+    name="memory_cache_usage",
+    documentation="Usage of the in-process memory cache, by number of keys and size in bytes.",
+    labelnames=["unit"],
+    multiprocess_mode="livesum"
+)
+
+JOB_QUEUE_DEPTH = Gauge(
+    name="job_queue_depth",
+    documentation="Number of jobs waiting in the job queue, by queue.",
+    labelnames=["queue"],
+    multiprocess_mode="mostrecent"
+)
+
+JOB_LAG = Histogram(
+    name="job_lag_seconds",
+    documentation="Time a job waited in the queue before a worker picked it, in seconds.",
+    labelnames=["name"]
+)
+
+JOB_DURATION = Histogram(
+    name="job_duration_seconds",
+    documentation="Time taken to run a job, in seconds.",
+    labelnames=["name"]
+)
+
+JOBS_PROCESSED = Counter(
+    name="jobs_processed_total",
+    documentation="Total number of jobs processed, by job name and status.",
+    labelnames=["name", "status"]
+)
+
+PASSWORD_HASH_WAIT = Histogram(
+    name="password_hash_wait_seconds",
+    documentation="Time a password hashing call waited for a thread, in seconds.",
+    labelnames=["operation"]
+)
+
+PASSWORD_HASH_DURATION = Histogram(
+    name="password_hash_duration_seconds",
+    documentation="Time taken to hash or verify a password, in seconds.",
+    labelnames=["operation"]
+)
+
+PASSWORD_HASH_REJECTED = Counter(
+    name="password_hash_rejected_total",
+    documentation="Total number of password hashing calls rejected since the pool was full.",
+    labelnames=["operation"]
+)
+
+
+# Functions which export current state of in-process resources (i.e: connection pools) on gauges,
+# They're run periodically by run_samplers since gauge callbacks (set_function) aren't
+# supported when metrics are collected across multiple worker processes.
+SAMPLERS: list[Callable[[], None]] = []
+
+
+def track_pool(pool: str, get_stats: Callable[[], dict[str, int]]) -> None:
+    """
+    Export connection pool usage on prometheus
+    """
+
+    def sample() -> None:
+        for state, value in get_stats().items():
+            CONNECTION_POOL_CONNECTIONS.labels(pool=pool, state=state).set(value)
+
+    SAMPLERS.append(sample)
+
+
+def track_memory_cache(get_stats: Callable[[], dict[str, int]]) -> None:
+    """
+    Export in-process memory cache usage on prometheus
+    """
+
+    def sample() -> None:
+        for unit, value in get_stats().items():
+            MEMORY_CACHE_USAGE.labels(unit=unit).set(value)
+
+    SAMPLERS.append(sample)
+
+
+async def run_samplers(interval: float) -> None:
+    """
+    Keep refreshing the tracked gauges, Till the task is cancelled.
+    """
+
+    while True:
+        for sample in SAMPLERS:
+            try:
+                sample()
+            except Exception:
+                logger.exception("Failed to sample metrics")
+
+        await asyncio.sleep(interval)
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Get the registry to expose on /metrics, When the app runs with multiple
+    worker processes (PROMETHEUS_MULTIPROC_DIR is set) metrics of all the workers are aggregated.
+    """
+
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    return registry
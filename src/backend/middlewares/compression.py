@@ -0,0 +1,116 @@
+import gzip
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import env
+
+# Supported content encodings, In the order of preference
+ENCODINGS = ["br", "gzip"]
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def get_accepted_encoding(accept_encoding: str) -> str | None:
+    """
+    Pick the preferred encoding accepted by the client from the given Accept-Encoding header,
+    None if the client doesn't accept any of the supported encodings.
+    """
+
+    accepted: dict[str, float] = {}
+
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0
+
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=env.RESPONSE_BROTLI_QUALITY)
+
+    return gzip.compress(body, compresslevel=env.RESPONSE_GZIP_LEVEL)
+
+
+def add_vary_header(headers: MutableHeaders, vary: str) -> None:
+    """
+    Add the given header in Vary header of the response, Unless it's already there
+    """
+
+    existing = [value.strip().lower() for value in headers.get("vary", "").split(",")]
+
+    if vary.lower() not in existing:
+        headers.add_vary_header(vary)
+
+
+class CompressionMiddleware:
+    """
+    Compression Middleware to compress JSON and text responses with brotli or gzip
+    (as accepted by the client), Once they're larger than the minimum size.
+
+    It's a pure ASGI middleware, Only the responses sent in a single body message are compressed,
+    Streaming responses and the ones which are already encoded (i.e: pre-compressed cached
+    responses) are passed through as they are.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = env.RESPONSE_COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = get_accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+
+        # Start message is held till the first body message, To know whether to compress the body
+        response_start: Message = {}
+        is_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal is_started
+
+            if message["type"] == "http.response.start":
+                response_start.update(message)
+                return
+
+            if message["type"] != "http.response.body" or is_started:
+                await send(message)
+                return
+
+            is_started = True
+            headers = MutableHeaders(scope=response_start)
+            body = message.get("body", b"")
+
+            is_compressible = headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES) \
+                and "content-encoding" not in headers
+
+            if is_compressible:
+                add_vary_header(headers, "Accept-Encoding")
+
+                if encoding and not message.get("more_body") and len(body) >= self.minimum_size:
+                    body = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+
+            await send(response_start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,118 +1,184 @@
+import json
+import queue
+import random
+import re
 import sys
 import time
 import logging
 import uuid
+from contextvars import ContextVar
 from datetime import datetime, UTC
-from typing import Callable
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
 
-from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+import env
 
-def get_logger() -> logging.Logger:
+# ID of the request being processed, So every log record can be tied to its request
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Mask values of password like fields, In case request bodies are logged
+PASSWORD_PATTERN = re.compile(r'("[^"]*password[^"]*"\s*:\s*)"[^"]*"?', re.IGNORECASE)
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format log records as a single JSON line
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "timestamp": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None)
+        }
+
+        if isinstance(record.msg, dict):
+            data.update(record.msg)
+        else:
+            data["message"] = record.getMessage()
+
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(data, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler which leaves formatting to the listener thread,
+    Unlike the default one which formats records on the calling thread (i.e: the event loop).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return record
+
+
+def get_logger() -> tuple[logging.Logger, QueueListener]:
     """
-    Configure logger
+    Configure logger, Records are pushed to a queue and a background
+    listener thread formats and writes them to stdout.
     """
 
     _logger = logging.getLogger(__name__)
     _logger.setLevel(logging.DEBUG)
 
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.DEBUG)
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(JSONFormatter())
 
-    _logger.addHandler(console_handler)
-    _logger.propagate = True
+    log_queue = queue.SimpleQueue()
+    _logger.addHandler(DeferredQueueHandler(log_queue))
+    _logger.propagate = False
 
-    return _logger
+    return _logger, QueueListener(log_queue, console_handler, respect_handler_level=True)
 
 
-logger = get_logger()
+logger, log_listener = get_logger()
 
 
 class LoggingMiddleware:
     """
     Logging Middleware to log all details related to a request & response or
-    any error that gets raised.
+    any error that gets raised, As a single line per request.
+
+    It's a pure ASGI middleware, So the response is passed through as it is
+    and only its start message is observed.
     """
 
-    def __init__(self):
-        self.request_id = str(uuid.uuid4())
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.headers = {header.strip().lower() for header in env.LOG_HEADERS.split(",") if header.strip()}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def __call__(self, request: Request, call_next: Callable) -> Response:
         # Start timing the request
         start_time = time.perf_counter()
 
-        # Generate unique request ID
-        request_id = self.request_id
+        # Use request ID of the caller (i.e: a proxy) if any, Otherwise generate a new one
+        request_headers = Headers(scope=scope)
+        request_id = request_headers.get("x-request-id", "")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
 
-        # Log request details
-        await self._log_request(request, request_id)
+        # Capture request body only when it's enabled, As it gets read by the app
+        body = bytearray()
+        capture_body = bool(env.LOG_BODY_MAX_BYTES) and scope["method"] in ["POST", "PUT", "PATCH"]
 
-        # Process the request through the application
-        try:
-            response = await call_next(request)
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < env.LOG_BODY_MAX_BYTES:
+                body.extend(message.get("body", b"")[:env.LOG_BODY_MAX_BYTES - len(body)])
+            return message
 
-            # Log response details
-            await self._log_response(response, request, start_time, request_id)
+        response_start: Message = {}
 
-            return response
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_start.update(message)
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        # Process the request through the application
+        try:
+            await self.app(scope, receive_wrapper if capture_body else receive, send_wrapper)
 
         except Exception as e:
             # Log any errors
-            logger.error(f"Request {request_id} failed with error: {str(e)}")
+            self._log(scope, request_headers, request_id, start_time, body if capture_body else None,
+                      error=e)
             raise e
 
-    async def _log_request(self, request: Request, request_id: str):
+        finally:
+            request_id_var.reset(token)
+
+        status_code = response_start.get("status", 500)
+
+        # Log all errors, But only a sample of successful requests
+        if status_code >= 400 or random.random() < env.LOG_SUCCESS_SAMPLE_RATE:
+            self._log(scope, request_headers, request_id, start_time, body if capture_body else None,
+                      response_start=response_start)
+
+    def _log(self, scope: Scope, request_headers: Headers, request_id: str, start_time: float,
+             body: bytearray | None, response_start: Message | None = None,
+             error: Exception | None = None) -> None:
         # Get client IP, handling proxy forwarding
-        client_ip = request.client.host
-        forwarded_for = request.headers.get("X-Forwarded-For")
+        client_ip = scope["client"][0] if scope.get("client") else None
+        forwarded_for = request_headers.get("X-Forwarded-For")
         if forwarded_for:
             client_ip = forwarded_for.split(",")[0]
 
-        # Get request body if available
-        body = None
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                body = body.decode()
-            except Exception as _:
-                body = "Could not decode body"
-
-        request_data = {
-            "request_id": request_id,
-            "timestamp": datetime.now(UTC).isoformat(),
+        data: dict[str, Any] = {
+            "message": f"{scope['method']} {scope['path']}",
             "client_ip": client_ip,
-            "method": request.method,
-            "url": str(request.url),
-            "path_params": request.path_params,
-            "query_params": request.query_params.__dict__,
-            "headers": request.headers.__dict__,
-            "cookies": request.cookies,
-            "body": body,
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope["query_string"].decode("latin-1"),
+            "headers": {key: value for key, value in request_headers.items() if key in self.headers},
+            "process_time_ms": round((time.perf_counter() - start_time) * 1000, 2)
         }
 
-        logger.info({
-            "message": f"Incoming request {request_id}",
-            "request": request_data
-        })
-
-    async def _log_response(self, response: Response, _: Request,
-                            start_time: float, request_id: str):
+        if body is not None:
+            data["body"] = PASSWORD_PATTERN.sub(r'\1"***"', body.decode(errors="replace"))
 
-        process_time = time.perf_counter() - start_time
+        if response_start is not None:
+            data["status_code"] = response_start.get("status", 500)
+            data["response_headers"] = {
+                key: value for key, value in Headers(raw=response_start.get("headers", [])).items()
+                if key in self.headers
+            }
 
-        response_data = {
-            "request_id": request_id,
-            "timestamp": datetime.now(UTC).isoformat(),
-            "status_code": response.status_code,
-            "process_time_ms": round(process_time, 2),
-            "headers": response.headers.__dict__,
-        }
+        if error is not None:
+            data["status_code"] = 500
+            data["error"] = str(error)
 
-        logger.info({
-            "message": f"Response for request {request_id}",
-            "response": response_data
-        })
+        # Request ID is set explicitly, Since the request context is already reset
+        logger.log(logging.ERROR if error is not None or data["status_code"] >= 500 else logging.INFO,
+                   data, extra={"request_id": request_id}, exc_info=error)
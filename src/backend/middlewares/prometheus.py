@@ -1,49 +1,84 @@
 import time
-from typing import Callable
 
-from fastapi import Request, Response
-from prometheus_client import Counter, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import metrics
+
+# Label of the requests which didn't match any route (i.e: 404s), So random paths
+# don't create new time series
+UNMATCHED_PATH = "<unmatched>"
+
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+def get_path_label(scope: Scope, root_path: str = "") -> str:
+    """
+    Get template of the route which handled the request,
+    Routing sets the matched route on the scope.
+
+    Mounted apps (i.e: /metrics) don't set a route, But their path is appended
+    in the root path of the scope (from the given root path of the request).
+    """
+
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+
+    mounted_root_path = scope.get("root_path", "")
+
+    if not path and mounted_root_path.startswith(root_path):
+        path = mounted_root_path[len(root_path):]
+
+    return path or UNMATCHED_PATH
 
 
 class PrometheusMiddleware:
     """
     Prometheus Middleware for recording request related stats like:
-    Total request count and request duration on prometheus.
+    Total request count, Requests in progress and request duration on prometheus.
+
+    It's a pure ASGI middleware, So the response is passed through as it is
+    and only its start message is observed.
     """
 
-    def __init__(self):
-        # Initialize the http_request_total and http_request_duration
-        self.http_request_total = Counter(
-            name="http_requests_total",
-            documentation="Total number of HTTP requests.",
-            labelnames=["method", "path"]
-        )
-
-        self.http_request_duration = Histogram(
-            name="http_request_duration_seconds",
-            documentation="HTTP request duration in seconds.",
-            labelnames=["method", "path", "status"]
-        )
-
-    async def __call__(self, request: Request, call_next: Callable) -> Response:
-        # Record total requests received
-        self.http_request_total.labels(method=request.method,
-                                       path=request.url.path).inc()
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+        in_progress = metrics.HTTP_REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
 
         # Start timing the request
         start_time = time.perf_counter()
+        status_code = 500
+        root_path = scope.get("root_path", "")
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
         # Continue processing the request
-        response: Response = await call_next(request)
+        try:
+            await self.app(scope, receive, send_wrapper)
 
-        # Find how much time it took to process the request, In seconds.
-        duration = time.perf_counter() - start_time
+        finally:
+            # Find how much time it took to process the request, In seconds.
+            duration = time.perf_counter() - start_time
+            in_progress.dec()
 
-        # Record the request duration.
-        self.http_request_duration.labels(
-            method=request.method,
-            path=request.url.path,
-            status=response.status_code
-        ).observe(duration)
+            # Route is known only once the request is routed
+            path = get_path_label(scope, root_path)
 
-        return response
+            # Record total requests and the request duration.
+            metrics.HTTP_REQUESTS.labels(method=method, path=path).inc()
+            metrics.HTTP_REQUEST_DURATION.labels(
+                method=method,
+                path=path,
+                status=status_code
+            ).observe(duration)
@@ -0,0 +1,32 @@
+"""Added watchlist listing index
+
+Revision ID: 9b1f3c7d2e5a
+Revises: 4906c4231d87
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1f3c7d2e5a'
+down_revision: Union[str, None] = '4906c4231d87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build the index without locking the table for writes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_watchlist_user_listing', 'watchlist',
+                        ['user_id', 'is_complete', sa.text('created_at DESC'), sa.text('id DESC')],
+                        unique=False, postgresql_include=['movie_id', 'modified_at'],
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_watchlist_user_listing', table_name='watchlist',
+                      postgresql_concurrently=True)
@@ -33,3 +33,9 @@ WATCHLIST_ITEM_DOES_NOT_EXISTS = "Watchlist item does not exists"
 WATCHLIST_ITEM_FORBIDDEN_ERROR = "You cannot access this item"
 MOVIE_MARKED_FAVORITE_SUCCESSFULLY = "Movie marked as favorite successfully"
 MOVIE_REMOVED_AS_FAVORITE_SUCCESSFULLY = "Movie unmarked as favorite successfully"
+INVALID_CURSOR = "Invalid cursor"
+WATCHLIST_ITEMS_ADDED_SUCCESSFULLY = "Watchlist items added successfully"
+WATCHLIST_ITEMS_UPDATED_SUCCESSFULLY = "Watchlist items updated successfully"
+WATCHLIST_ITEMS_DELETED_SUCCESSFULLY = "Watchlist items deleted successfully"
+SERVER_BUSY = "Server is busy, Please try again shortly."
+INVALID_FIELDS = "Invalid fields: {}"
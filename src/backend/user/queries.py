@@ -7,29 +7,83 @@ import uuid
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import cache_keys
+import database
+from cache import CustomAsyncRedisClient
 from user.models import User
-from user.schemas import SignupRequest
-from user.utils import get_hashed_password
+from user.schemas import User as UserSchema, SignupRequest
+from user.utils import hash_password
 
 
 async def get_user_by_id(session: AsyncSession, user_id: uuid.UUID) -> User | None:
-    user = await session.get(User, user_id)
+    query = select(User).where(User.id == user_id)
+
+    user = await session.scalar(query.execution_options(query_name="get_user_by_id", use_replica=True))
+
+    # The user might have just signed up and not be on the replica yet
+    if not user and database.replica_engines:
+        user = await session.scalar(query.execution_options(query_name="get_user_by_id"))
+
     return user
 
 
+def get_user_cache_key(user_id: uuid.UUID | str) -> str:
+    return cache_keys.USER.key(user_id=user_id)
+
+
+async def get_cached_user_by_id(session: AsyncSession, cache: CustomAsyncRedisClient,
+                                user_id: uuid.UUID | str) -> User | None:
+    """
+    Retrieve user profile from cache (memory and redis) for a short duration,
+    And fall back to the DB. The returned object is not attached to any session,
+    So it should only be read.
+
+    Concurrent misses share a single load, Which may outlive the caller who started it.
+    So unlike the rest of the request, It reads with a session of its own (routed as the given
+    session, i.e: sticky to the primary) instead of the given one. The user is loaded before the
+    request runs any query, So a miss doesn't hold two connections at once, It checks out one for
+    the load and the request checks out its own afterwards.
+
+    Profiles are never updated or deleted, So the cache expiry is the only invalidation.
+    Any such write path should drop the cached profile with cache.delete(get_user_cache_key(...)).
+    """
+
+    use_replica = session.info.get("use_replica", True)
+
+    async def fetch_user() -> dict:
+        async with database.SessionLocal() as own_session:
+            own_session.info["use_replica"] = use_replica
+            user = await get_user_by_id(own_session, user_id)
+
+            if not user:
+                raise LookupError(user_id)
+
+            return UserSchema.model_validate(user).model_dump(mode="json")
+
+    try:
+        data = await cache.get_or_set(get_user_cache_key(user_id), fetch_user,
+                                      expiry=cache_keys.USER.expiry,
+                                      local_expiry=cache_keys.USER.local_expiry)
+    except LookupError:
+        return None
+
+    return User(**UserSchema.model_validate(data).model_dump())
+
+
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
-    result = await session.execute(select(User).where(User.email == email.lower()))
-    user = result.fetchone()
-    if user:
-        # Since fetchone return result in a tuple,
-        # Need to pick the first object from the tuple
-        user = user[0]
+    query = select(User).where(User.email == email.lower())
+
+    user = await session.scalar(query.execution_options(query_name="get_user_by_email", use_replica=True))
+
+    # The user might have just signed up and not be on the replica yet
+    if not user and database.replica_engines:
+        user = await session.scalar(query.execution_options(query_name="get_user_by_email"))
 
     return user
 
 
 async def create_user(session: AsyncSession, request: SignupRequest) -> User:
-    hashed_password = get_hashed_password(request.password)
+    hashed_password = await hash_password(request.password)
 
     user = User(
         id=uuid.uuid4(),
@@ -42,4 +96,7 @@ async def create_user(session: AsyncSession, request: SignupRequest) -> User:
     session.add(user)
     await session.commit()
 
+    # Keep the reads of the new user on the primary for a while, See get_async_db_session
+    session.info["user_id"] = str(user.id)
+
     return user
@@ -11,7 +11,7 @@ from dependencies import get_async_db_session
 from user.models import User
 from user.queries import create_user, get_user_by_email
 from user.schemas import User as UserSchema, SignupRequest, LoginRequest
-from user.utils import generate_auth_tokens, validate_password, check_password
+from user.utils import generate_auth_tokens, validate_password, verify_password, PasswordHashPoolFull
 
 router = APIRouter()
 
@@ -60,6 +60,10 @@ async def register(
         raise HTTPException(detail=str(
             e), status_code=status.HTTP_400_BAD_REQUEST) from e
 
+    except PasswordHashPoolFull as e:
+        raise HTTPException(detail=str(e), status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={"Retry-After": "1"}) from e
+
     except exc.SQLAlchemyError as e:
         raise HTTPException(detail=str(
             e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
@@ -79,7 +83,7 @@ async def login(
                                 status_code=status.HTTP_403_FORBIDDEN)
 
         # Check user password
-        if not check_password(request.password, user.password):
+        if not await verify_password(request.password, user.password):
             raise HTTPException(detail=strings.INVALID_PASSWORD,
                                 status_code=status.HTTP_403_FORBIDDEN)
 
@@ -98,6 +102,10 @@ async def login(
         raise HTTPException(detail=str(
             e), status_code=status.HTTP_400_BAD_REQUEST) from e
 
+    except PasswordHashPoolFull as e:
+        raise HTTPException(detail=str(e), status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={"Retry-After": "1"}) from e
+
     except exc.SQLAlchemyError as e:
         raise HTTPException(detail=str(
             e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
@@ -1,10 +1,35 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+from typing import Callable, TypeVar
+
 import jwt
 import bcrypt
-from datetime import datetime, timedelta, UTC
 
 import env
+import metrics
 import strings
 
+T = TypeVar("T")
+
+# Dedicated threads for bcrypt, So hashing never blocks the event loop
+# (bcrypt releases the GIL while hashing) and can't starve the default executor.
+password_hash_executor = ThreadPoolExecutor(max_workers=env.PASSWORD_HASH_WORKERS,
+                                            thread_name_prefix="password-hash")
+
+# Number of hashing calls which are either running or waiting for a thread,
+# It's released from the pool threads so it's guarded by a lock.
+pending_password_hashes = 0
+pending_password_hashes_lock = threading.Lock()
+
+
+class PasswordHashPoolFull(Exception):
+    """
+    Raised when too many hashing calls are already waiting for a thread
+    """
+
 
 def get_hashed_password(password: str) -> str:
     """
@@ -26,6 +51,64 @@ def check_password(raw_password: str, hashed_password: str) -> bool:
     )
 
 
+async def run_password_hash(operation: str, func: Callable[..., T], *args) -> T:
+    """
+    Run the given bcrypt call on the password hash pool, Fail fast with
+    PasswordHashPoolFull instead of queueing when the pool is overloaded.
+    """
+
+    global pending_password_hashes
+
+    with pending_password_hashes_lock:
+        if pending_password_hashes >= env.PASSWORD_HASH_WORKERS + env.PASSWORD_HASH_QUEUE_LIMIT:
+            metrics.PASSWORD_HASH_REJECTED.labels(operation=operation).inc()
+            raise PasswordHashPoolFull(strings.SERVER_BUSY)
+
+        pending_password_hashes += 1
+
+    queued_at = time.perf_counter()
+
+    def run() -> T:
+        started_at = time.perf_counter()
+        metrics.PASSWORD_HASH_WAIT.labels(operation=operation).observe(started_at - queued_at)
+
+        try:
+            return func(*args)
+        finally:
+            metrics.PASSWORD_HASH_DURATION.labels(operation=operation).observe(
+                time.perf_counter() - started_at
+            )
+
+    def release(_: Future) -> None:
+        global pending_password_hashes
+
+        with pending_password_hashes_lock:
+            pending_password_hashes -= 1
+
+    # The slot is released once the call is done (or cancelled before it started) on the pool,
+    # A cancelled caller doesn't stop the call which is already running on a thread.
+    future = password_hash_executor.submit(run)
+    future.add_done_callback(release)
+
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password(password: str) -> str:
+    """
+    Same as get_hashed_password, But runs on the password hash pool
+    """
+
+    return await run_password_hash("hash", get_hashed_password, password)
+
+
+async def verify_password(raw_password: str, hashed_password: str) -> bool:
+    """
+    Same as check_password, But runs on the password hash pool
+    """
+
+    return await run_password_hash("verify", check_password, raw_password, hashed_password)
+
+
 def has_digits(password: str) -> bool:
     """
     Function for checking if password contains a digit or not
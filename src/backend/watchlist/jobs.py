@@ -0,0 +1,27 @@
+"""
+Background jobs related to the WatchList, Which are run by the job queue workers.
+"""
+
+import cache_keys
+from cache import CustomAsyncRedisClient
+from content.api_client import CustomAsyncClient
+from jobs import job
+from watchlist.utils import get_movie_details_key, fetch_movie_details
+
+ENRICH_MOVIE_DETAILS = "enrich_movie_details"
+
+
+@job(ENRICH_MOVIE_DETAILS)
+async def enrich_movie_details(client: CustomAsyncClient, cache: CustomAsyncRedisClient, movie_id: int) -> None:
+    """
+    Fetch top level movie details from MovieDB API And save it into cache,
+    So that we can retrieve that when we return the watchlist
+    """
+
+    key = get_movie_details_key(movie_id)
+
+    if await cache.client.exists(key):
+        return
+
+    data = await fetch_movie_details(client, movie_id)
+    await cache.set(key, data, expiry=cache_keys.WATCHLIST_MOVIE_DETAIL.expiry)
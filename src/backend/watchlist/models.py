@@ -22,6 +22,12 @@ class WatchList(Base):
 
     __table_args__ = (
         sa.UniqueConstraint("user_id", "movie_id", name="unique_user_movie"),
+
+        # Serve the user watchlist listing (newest first) straight from the index,
+        # Remaining columns are included so that the listing doesn't need to visit the table.
+        sa.Index("ix_watchlist_user_listing", "user_id", "is_complete",
+                 sa.text("created_at DESC"), sa.text("id DESC"),
+                 postgresql_include=["movie_id", "modified_at"]),
     )
 
     def __str__(self) -> str:
@@ -3,28 +3,74 @@ ORM queries which will be used in WatchList API modules
 """
 
 import uuid
+from datetime import datetime
 
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, func, tuple_, case, true, false
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi_pagination import Params
-from fastapi_pagination.ext.sqlalchemy import paginate
+from fastapi_pagination.ext.sqlalchemy import create_count_query, paginate
 
 from user.models import User
 from watchlist.models import WatchList
-from watchlist.schemas import WatchListAddItemRequest, WatchListUpdateItemRequest
+from watchlist.schemas import (
+    WatchListAddItemRequest,
+    WatchListUpdateItemRequest,
+    WatchListBulkUpdateItem
+)
 
 
 async def get_user_watchlist(session: AsyncSession, user: User, params: Params, is_complete: bool | None):
     query = select(WatchList).where(WatchList.user_id == user.id).order_by(
-        WatchList.created_at.desc())
+        WatchList.created_at.desc(), WatchList.id.desc()).execution_options(query_name="get_user_watchlist", use_replica=True)
 
     if is_complete is not None:
         query = query.filter_by(is_complete=is_complete)
 
-    results = await paginate(session, query, params)
+    # Count query is built from the query but doesn't keep its execution options
+    count_query = create_count_query(query).execution_options(query_name="count_user_watchlist_page",
+                                                              use_replica=True)
+
+    results = await paginate(session, query, params, count_query=count_query)
     return results
 
 
+async def get_user_watchlist_after(session: AsyncSession, user: User, size: int, is_complete: bool | None,
+                                   after: tuple[datetime, uuid.UUID] | None) -> tuple[list[WatchList], bool]:
+    """
+    Keyset pagination over the user watchlist, Which seeks directly to the items
+    after the given (created_at, id) position instead of scanning over an offset.
+    Also return whether there are more items after the page.
+    """
+
+    query = select(WatchList).where(WatchList.user_id == user.id)
+
+    if is_complete is not None:
+        query = query.filter_by(is_complete=is_complete)
+
+    if after:
+        query = query.where(tuple_(WatchList.created_at, WatchList.id) < tuple_(*after))
+
+    # Fetch an extra item to find out if there is a next page
+    query = query.order_by(WatchList.created_at.desc(), WatchList.id.desc()).limit(size + 1) \
+        .execution_options(query_name="get_user_watchlist_after", use_replica=True)
+
+    result = await session.scalars(query)
+    items = list(result.all())
+
+    return items[:size], len(items) > size
+
+
+async def count_user_watchlist(session: AsyncSession, user: User, is_complete: bool | None) -> int:
+    query = select(func.count()).select_from(WatchList).where(WatchList.user_id == user.id) \
+        .execution_options(query_name="count_user_watchlist", use_replica=True)
+
+    if is_complete is not None:
+        query = query.filter_by(is_complete=is_complete)
+
+    return await session.scalar(query)
+
+
 async def add_watchlist_item(session: AsyncSession, user: User, request: WatchListAddItemRequest) -> WatchList:
     item = WatchList(
         id=uuid.uuid4(),
@@ -40,13 +86,15 @@ async def add_watchlist_item(session: AsyncSession, user: User, request: WatchLi
 
 
 async def get_watchlist_item(session: AsyncSession, watchlist_item_id: uuid.UUID) -> WatchList:
-    item = await session.get(WatchList, watchlist_item_id)
+    item = await session.get(WatchList, watchlist_item_id,
+                             execution_options={"query_name": "get_watchlist_item"})
     return item
 
 
 async def is_watchlist_item_exists(session: AsyncSession, user: User, movie_id: int) -> bool:
     query = select(WatchList).where(WatchList.user_id ==
-                                    user.id, WatchList.movie_id == movie_id)
+                                    user.id, WatchList.movie_id == movie_id) \
+        .execution_options(query_name="is_watchlist_item_exists", use_replica=True)
 
     result = await session.execute(query)
     watchlist_item = result.fetchone()
@@ -57,14 +105,80 @@ async def is_watchlist_item_exists(session: AsyncSession, user: User, movie_id:
 async def update_watchlist_item(session: AsyncSession, watchlist_item_id: uuid.UUID,
                                 request: WatchListUpdateItemRequest) -> None:
     query = update(WatchList).where(WatchList.id == watchlist_item_id).values(
-        request.model_dump(exclude_none=True))
+        request.model_dump(exclude_none=True)).execution_options(query_name="update_watchlist_item")
 
     await session.execute(query)
     await session.commit()
 
 
 async def delete_watchlist_item(session: AsyncSession, watchlist_item_id: uuid.UUID) -> None:
-    query = delete(WatchList).where(WatchList.id == watchlist_item_id)
+    query = delete(WatchList).where(WatchList.id == watchlist_item_id) \
+        .execution_options(query_name="delete_watchlist_item")
 
     await session.execute(query)
     await session.commit()
+
+
+async def bulk_add_watchlist_items(session: AsyncSession, user: User, movie_ids: list[int]) -> list[WatchList]:
+    """
+    Add the given movies in user watchlist with a single statement,
+    Movies which are already in the watchlist are skipped. Return the added items.
+    """
+
+    query = insert(WatchList).values([
+        {"id": uuid.uuid4(), "user_id": user.id, "movie_id": movie_id, "is_complete": False}
+        for movie_id in movie_ids
+    ]).on_conflict_do_nothing(constraint="unique_user_movie").returning(WatchList) \
+        .execution_options(query_name="bulk_add_watchlist_items")
+
+    result = await session.scalars(query)
+    items = list(result.all())
+    await session.commit()
+
+    return items
+
+
+async def bulk_update_watchlist_items(session: AsyncSession, user: User,
+                                      items: list[WatchListBulkUpdateItem]) -> list[WatchList]:
+    """
+    Update the given watchlist items of the user with a single statement,
+    Items which don't exist or belong to someone else are skipped. Return the updated items.
+    """
+
+    query = update(WatchList).where(
+        WatchList.user_id == user.id,
+        WatchList.id.in_([item.id for item in items])
+    ).values(
+        is_complete=case(
+            {item.id: true() if item.is_complete else false() for item in items},
+            value=WatchList.id
+        ),
+        modified_at=func.now()
+    ).returning(WatchList).execution_options(synchronize_session=False,
+                                             query_name="bulk_update_watchlist_items")
+
+    result = await session.scalars(query)
+    updated_items = list(result.all())
+    await session.commit()
+
+    return updated_items
+
+
+async def bulk_delete_watchlist_items(session: AsyncSession, user: User,
+                                      watchlist_item_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+    """
+    Delete the given watchlist items of the user with a single statement,
+    Items which don't exist or belong to someone else are skipped. Return IDs of the deleted items.
+    """
+
+    query = delete(WatchList).where(
+        WatchList.user_id == user.id,
+        WatchList.id.in_(watchlist_item_ids)
+    ).returning(WatchList.id).execution_options(synchronize_session=False,
+                                                query_name="bulk_delete_watchlist_items")
+
+    result = await session.scalars(query)
+    deleted_ids = list(result.all())
+    await session.commit()
+
+    return deleted_ids
@@ -1,12 +1,14 @@
+import math
 import uuid
 from typing import Annotated, Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import exc
 from fastapi_pagination import Params
 
+import jobs
 import strings
 from dependencies import get_async_db_session, get_user, get_cache_client
 from cache import CustomAsyncRedisClient
@@ -15,16 +17,31 @@ from user.models import User
 from watchlist.models import WatchList
 from watchlist.queries import (
     get_user_watchlist,
+    get_user_watchlist_after,
+    count_user_watchlist,
     get_watchlist_item,
     add_watchlist_item,
     update_watchlist_item,
-    delete_watchlist_item
+    delete_watchlist_item,
+    bulk_add_watchlist_items,
+    bulk_update_watchlist_items,
+    bulk_delete_watchlist_items
 )
 from watchlist.schemas import (
     WatchList as WatchListSchema,
     WatchListAddItemRequest,
-    WatchListUpdateItemRequest
+    WatchListUpdateItemRequest,
+    WatchListBulkAddRequest,
+    WatchListBulkUpdateRequest,
+    WatchListBulkRemoveRequest
 )
+from watchlist.utils import (
+    encode_cursor,
+    decode_cursor,
+    get_movie_details_key,
+    backfill_movie_details
+)
+from watchlist.jobs import ENRICH_MOVIE_DETAILS
 from content.api_client import CustomAsyncClient, get_client
 
 router = APIRouter()
@@ -34,37 +51,87 @@ def parse_watchlist_obj_to_dict(obj: WatchList) -> dict[str, Any]:
     return WatchListSchema.model_validate(obj).model_dump(mode="json")
 
 
+async def get_watchlist_items(client: CustomAsyncClient, cache: CustomAsyncRedisClient,
+                              watchlist_items: list[WatchList]) -> list[dict[str, Any] | None]:
+    """
+    Get movie details of the given watchlist items, Along with the watchlist item details.
+    """
+
+    watchlist = [parse_watchlist_obj_to_dict(item) for item in watchlist_items]
+
+    # Fetch movie details of the whole page from cache at once
+    movie_ids = [data["movie_id"] for data in watchlist]
+    cached_details = await cache.get_many(list(map(get_movie_details_key, movie_ids)))
+
+    # Fill the movie details which are missing from cache
+    missing_movie_ids = [movie_id for movie_id, movie_details in zip(movie_ids, cached_details)
+                         if not movie_details]
+    fetched_details = await backfill_movie_details(client, cache, missing_movie_ids)
+
+    items = []
+
+    for data, movie_details in zip(watchlist, cached_details):
+        movie_details = movie_details or fetched_details.get(data["movie_id"])
+
+        if movie_details:
+            movie_details.update({"watchlist": data})
+
+        items.append(movie_details)
+
+    return items
+
+
 @router.get("/")
 async def get_watchlist(
     session: Annotated[AsyncSession, Depends(get_async_db_session)],
     user: Annotated[User, Depends(get_user)],
+    client: Annotated[CustomAsyncClient, Depends(get_client)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)],
     page: int = 1,
     size: int = 20,
-    is_complete: bool | None = None
-) -> JSONResponse:
+    is_complete: bool | None = None,
+    after: str | None = None,
+    include_total: bool = True
+) -> ORJSONResponse:
+    """
+    Get watchlist of the current user.
+
+    Pages are fetched by offset (page number), Unless a cursor is passed in "after"
+    Or the total is not requested, Then the items are fetched after the cursor position.
+    Every page returns the cursor of its next page in "next".
+    """
+
     try:
         params = Params(page=page, size=size)
-        page = await get_user_watchlist(session, user, params, is_complete)
-        items = []
-
-        for item in page.items:
-            data = parse_watchlist_obj_to_dict(item)
-
-            # Fetch movie details from cache
-            key = f"{data['movie_id']}-watchlist_movie_detail"
-            movie_details = await cache.get(key)
-
-            if movie_details:
-                movie_details.update({"watchlist": data})
 
-            items.append(movie_details)
-
-        return JSONResponse({
-            "page": page.page if items else 0,
-            "total_pages": page.pages if items else 0,
+        if after is None and include_total:
+            page = await get_user_watchlist(session, user, params, is_complete)
+            items = await get_watchlist_items(client, cache, page.items)
+
+            return ORJSONResponse({
+                "page": page.page if items else 0,
+                "total_pages": page.pages if items else 0,
+                "next": encode_cursor(page.items[-1]) if page.page < page.pages else None,
+                "results": items
+            }, status_code=status.HTTP_200_OK)
+
+        watchlist_items, has_more = await get_user_watchlist_after(
+            session, user, params.size, is_complete,
+            decode_cursor(after) if after else None
+        )
+        items = await get_watchlist_items(client, cache, watchlist_items)
+
+        total_pages = None
+        if include_total:
+            total = await count_user_watchlist(session, user, is_complete)
+            total_pages = math.ceil(total / params.size)
+
+        return ORJSONResponse({
+            "total_pages": total_pages,
+            "next": encode_cursor(watchlist_items[-1]) if has_more else None,
             "results": items
         }, status_code=status.HTTP_200_OK)
+
     except (
         exc.IntegrityError,
         ValueError
@@ -81,30 +148,19 @@ async def get_watchlist(
 async def add_item_in_watchlist(
     session: Annotated[AsyncSession, Depends(get_async_db_session)],
     user: Annotated[User, Depends(get_user)],
-    client: Annotated[CustomAsyncClient, Depends(get_client)],
     cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)],
     request: WatchListAddItemRequest
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         item = await add_watchlist_item(session, user,
                                         request)
 
-        # Fetch top level movie details from MovieDB API And save it into cache,
+        # Fetch top level movie details from MovieDB API And save it into cache in the background,
         # So that we can retrieve that when we return the watchlist
-        key = f"{request.movie_id}-watchlist_movie_detail"
-        movie_details = await cache.get(key)
-
-        if not movie_details:
-            response = await client.get(endpoint=f"/movie/{request.movie_id}")
-            data = response.json()
-            data["genre_ids"] = list(map(
-                lambda genre: genre["id"],
-                data["genres"]
-            ))
-
-            await cache.set(key, data)
+        await jobs.enqueue(cache, ENRICH_MOVIE_DETAILS, {"movie_id": request.movie_id},
+                           dedupe_key=str(request.movie_id))
 
-        return JSONResponse({
+        return ORJSONResponse({
             "message": strings.WATCHLIST_ITEM_ADDED_SUCCESSFULLY,
             "data": parse_watchlist_obj_to_dict(item)
         }, status_code=status.HTTP_201_CREATED)
@@ -126,7 +182,7 @@ async def update_item_in_watchlist(
     user: Annotated[User, Depends(get_user)],
     request: WatchListUpdateItemRequest,
     watchlist_id: uuid.UUID
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         item = await get_watchlist_item(session, watchlist_id)
         if not item:
@@ -142,7 +198,7 @@ async def update_item_in_watchlist(
 
         await session.refresh(item)
 
-        return JSONResponse({
+        return ORJSONResponse({
             "message": strings.WATCHLIST_ITEM_UPDATED_SUCCESSFULLY,
             "data": parse_watchlist_obj_to_dict(item)
         }, status_code=status.HTTP_200_OK)
@@ -163,7 +219,7 @@ async def remove_watchlist_item(
     session: Annotated[AsyncSession, Depends(get_async_db_session)],
     user: Annotated[User, Depends(get_user)],
     watchlist_id: uuid.UUID
-) -> JSONResponse:
+) -> ORJSONResponse:
     try:
         item = await get_watchlist_item(session, watchlist_id)
         if not item:
@@ -176,7 +232,7 @@ async def remove_watchlist_item(
 
         await delete_watchlist_item(session, watchlist_id)
 
-        return JSONResponse({"message": strings.WATCHLIST_ITEM_DELETED_SUCCESSFULLY},
+        return ORJSONResponse({"message": strings.WATCHLIST_ITEM_DELETED_SUCCESSFULLY},
                             status_code=status.HTTP_200_OK)
     except (
         exc.IntegrityError,
@@ -188,3 +244,116 @@ async def remove_watchlist_item(
     except exc.SQLAlchemyError as e:
         raise HTTPException(detail=str(
             e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
+
+
+@router.post("/bulk/add-items/")
+async def bulk_add_items_in_watchlist(
+    session: Annotated[AsyncSession, Depends(get_async_db_session)],
+    user: Annotated[User, Depends(get_user)],
+    cache: Annotated[CustomAsyncRedisClient, Depends(get_cache_client)],
+    request: WatchListBulkAddRequest
+) -> ORJSONResponse:
+    try:
+        # Remove duplicate movies while keeping their order
+        movie_ids = list(dict.fromkeys(request.movie_ids))
+
+        items = await bulk_add_watchlist_items(session, user, movie_ids)
+        added_items = {item.movie_id: item for item in items}
+
+        # Fetch top level movie details of the added movies in the background
+        await jobs.enqueue_many(cache, ENRICH_MOVIE_DETAILS, [
+            ({"movie_id": movie_id}, str(movie_id)) for movie_id in added_items
+        ])
+
+        results = []
+
+        for movie_id in movie_ids:
+            item = added_items.get(movie_id)
+
+            results.append({
+                "movie_id": movie_id,
+                "status": "added" if item else "already_exists",
+                "data": parse_watchlist_obj_to_dict(item) if item else None
+            })
+
+        return ORJSONResponse({
+            "message": strings.WATCHLIST_ITEMS_ADDED_SUCCESSFULLY,
+            "results": results
+        }, status_code=status.HTTP_201_CREATED)
+    except (
+        exc.IntegrityError,
+        ValueError
+    ) as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_400_BAD_REQUEST) from e
+
+    except exc.SQLAlchemyError as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
+
+
+@router.put("/bulk/update-items/")
+async def bulk_update_items_in_watchlist(
+    session: Annotated[AsyncSession, Depends(get_async_db_session)],
+    user: Annotated[User, Depends(get_user)],
+    request: WatchListBulkUpdateRequest
+) -> ORJSONResponse:
+    try:
+        items = await bulk_update_watchlist_items(session, user, request.items)
+        updated_items = {item.id: item for item in items}
+
+        results = []
+
+        for request_item in request.items:
+            item = updated_items.get(request_item.id)
+
+            results.append({
+                "id": str(request_item.id),
+                "status": "updated" if item else "not_found",
+                "data": parse_watchlist_obj_to_dict(item) if item else None
+            })
+
+        return ORJSONResponse({
+            "message": strings.WATCHLIST_ITEMS_UPDATED_SUCCESSFULLY,
+            "results": results
+        }, status_code=status.HTTP_200_OK)
+    except (
+        exc.IntegrityError,
+        ValueError
+    ) as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_400_BAD_REQUEST) from e
+
+    except exc.SQLAlchemyError as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
+
+
+@router.delete("/bulk/remove-items/")
+async def bulk_remove_watchlist_items(
+    session: Annotated[AsyncSession, Depends(get_async_db_session)],
+    user: Annotated[User, Depends(get_user)],
+    request: WatchListBulkRemoveRequest
+) -> ORJSONResponse:
+    try:
+        deleted_ids = set(await bulk_delete_watchlist_items(session, user, request.ids))
+
+        results = [{
+            "id": str(watchlist_id),
+            "status": "removed" if watchlist_id in deleted_ids else "not_found"
+        } for watchlist_id in request.ids]
+
+        return ORJSONResponse({
+            "message": strings.WATCHLIST_ITEMS_DELETED_SUCCESSFULLY,
+            "results": results
+        }, status_code=status.HTTP_200_OK)
+    except (
+        exc.IntegrityError,
+        ValueError
+    ) as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_400_BAD_REQUEST) from e
+
+    except exc.SQLAlchemyError as e:
+        raise HTTPException(detail=str(
+            e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR) from e
@@ -3,7 +3,7 @@ Contains WatchList schemas which will be used in related APIs and ORM queries as
 """
 
 from datetime import datetime
-from pydantic import BaseModel, UUID4, PositiveInt
+from pydantic import BaseModel, Field, UUID4, PositiveInt
 
 
 class WatchList(BaseModel):
@@ -23,3 +23,19 @@ class WatchListAddItemRequest(BaseModel):
 
 class WatchListUpdateItemRequest(BaseModel):
     is_complete: bool
+
+
+class WatchListBulkAddRequest(BaseModel):
+    movie_ids: list[PositiveInt] = Field(min_length=1, max_length=500)
+
+
+class WatchListBulkUpdateItem(WatchListUpdateItemRequest):
+    id: UUID4
+
+
+class WatchListBulkUpdateRequest(BaseModel):
+    items: list[WatchListBulkUpdateItem] = Field(min_length=1, max_length=500)
+
+
+class WatchListBulkRemoveRequest(BaseModel):
+    ids: list[UUID4] = Field(min_length=1, max_length=500)
@@ -0,0 +1,91 @@
+import asyncio
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any
+
+import cache_keys
+import env
+import strings
+from cache import CustomAsyncRedisClient
+from content.api_client import CustomAsyncClient
+from watchlist.models import WatchList
+
+# Top level movie details which are returned along with the watchlist items,
+# The nested ones (i.e: production companies) are skipped while the response is parsed.
+MOVIE_DETAIL_FIELDS = [
+    "adult", "backdrop_path", "genres", "id", "imdb_id", "original_language", "original_title",
+    "overview", "popularity", "poster_path", "release_date", "runtime", "status", "tagline",
+    "title", "video", "vote_average", "vote_count"
+]
+
+
+def encode_cursor(item: WatchList) -> str:
+    """
+    Generate an opaque cursor pointing right after the given watchlist item
+    """
+
+    payload = json.dumps([item.created_at.isoformat(), str(item.id)])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("utf-8")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Retrieve the position (created_at, id) of a watchlist item from the given cursor,
+    Raise ValueError if the cursor is invalid.
+    """
+
+    try:
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+        return datetime.fromisoformat(created_at), uuid.UUID(item_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(strings.INVALID_CURSOR) from e
+
+
+def get_movie_details_key(movie_id: int) -> str:
+    return cache_keys.WATCHLIST_MOVIE_DETAIL.key(movie_id=movie_id)
+
+
+async def fetch_movie_details(client: CustomAsyncClient, movie_id: int) -> dict[str, Any]:
+    """
+    Fetch top level movie details from MovieDB API,
+    Which are returned along with the watchlist items.
+    """
+
+    data = await client.get_fields(endpoint=f"/movie/{movie_id}", fields=MOVIE_DETAIL_FIELDS)
+    data["genre_ids"] = list(map(
+        lambda genre: genre["id"],
+        data["genres"]
+    ))
+
+    return data
+
+
+async def backfill_movie_details(client: CustomAsyncClient, cache: CustomAsyncRedisClient,
+                                 movie_ids: list[int]) -> dict[int, dict[str, Any]]:
+    """
+    Fetch details of the given movies from MovieDB API concurrently (with bounded parallelism),
+    And save them into cache in a single round trip.
+    """
+
+    semaphore = asyncio.Semaphore(env.WATCHLIST_BACKFILL_CONCURRENCY)
+
+    async def fetch(movie_id: int) -> dict[str, Any]:
+        async with semaphore:
+            return await fetch_movie_details(client, movie_id)
+
+    results = await asyncio.gather(*map(fetch, movie_ids), return_exceptions=True)
+
+    # Skip the movies which couldn't be fetched, They'll be retried on the next request
+    movie_details = {
+        movie_id: result for movie_id, result in zip(movie_ids, results)
+        if not isinstance(result, Exception)
+    }
+
+    await cache.set_many({
+        get_movie_details_key(movie_id): data
+        for movie_id, data in movie_details.items()
+    }, expiry=cache_keys.WATCHLIST_MOVIE_DETAIL.expiry)
+
+    return movie_details
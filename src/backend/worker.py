@@ -0,0 +1,45 @@
+"""
+Run the job queue workers as a separate process, i.e: python worker.py
+"""
+
+import asyncio
+import signal
+
+from prometheus_client import start_http_server
+
+import env
+import jobs
+import metrics
+from cache import create_cache_client
+from content.api_client import create_client
+
+# Register the job handlers
+import watchlist.jobs  # noqa: F401
+
+
+async def main() -> None:
+    client = create_client()
+    cache = await create_cache_client()
+
+    # Expose the job metrics (queue depth, lag, duration...) of this process to be scraped,
+    # Since they aren't recorded by the app process which serves /metrics
+    start_http_server(env.JOB_WORKER_METRICS_PORT, registry=metrics.get_registry())
+
+    workers = jobs.start_workers(client, cache, env.JOB_WORKERS)
+
+    # Stop the workers gracefully on shutdown
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+
+    await jobs.stop_workers(workers)
+    await client.aclose()
+    await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())